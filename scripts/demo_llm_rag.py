@@ -1,11 +1,12 @@
 import asyncio
 import sys
+from collections import deque
 from pathlib import Path
-from typing import List, Dict
+from typing import AsyncIterator, Dict, Optional
 
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
-from components.llm_inference import LLMComponent
+from components.llm_inference import LLMComponent, BatchedLLMDispatcher
 from components.rag import RAGComponent
 from components.reranker import RerankerComponent
 from utils.config import load_config
@@ -14,11 +15,13 @@ from utils.config import load_config
 class ConversationalChatbot:
     """Interactive chatbot with conversation history."""
     
-    def __init__(self, llm: LLMComponent, rag: RAGComponent):
+    def __init__(self, llm: LLMComponent, rag: RAGComponent, dispatcher: Optional[BatchedLLMDispatcher] = None):
         self.llm = llm
         self.rag = rag
-        self.conversation_history: List[Dict[str, str]] = []
+        self.dispatcher = dispatcher  # optional: route turns through the batching dispatcher
         self.max_history = 10  # Keep last 10 exchanges
+        # deque evicts the oldest message in O(1) once max_history exchanges are stored
+        self.conversation_history: deque[Dict] = deque(maxlen=self.max_history * 2)
     
     def add_to_history(self, role: str, content: str):
         """Add a message to conversation history."""
@@ -26,9 +29,6 @@ class ConversationalChatbot:
             "role": role,
             "content": content
         })
-        # Keep only recent history
-        if len(self.conversation_history) > self.max_history * 2:
-            self.conversation_history = self.conversation_history[-self.max_history * 2:]
     
     def print_welcome(self):
         """Print welcome message."""
@@ -40,14 +40,26 @@ class ConversationalChatbot:
         print("Type 'clear' to clear conversation history")
         print("="*80 + "\n")
     
+    async def _generate(self, user_input: str) -> AsyncIterator[str]:
+        """Stream the answer from the LLM (cache hits arrive as a single chunk)."""
+        history = list(self.conversation_history)
+        if self.dispatcher:
+            response = await self.dispatcher.submit(user_input, conversation_history=history)
+            if response:
+                yield response
+        else:
+            async for token in self.llm.stream_response(user_input, use_rag=True, conversation_history=history):
+                yield token
+
     async def chat(self):
         """Main chat loop."""
         self.print_welcome()
+        loop = asyncio.get_running_loop()
         
         while True:
             try:
-                # Get user input
-                user_input = input("You: ").strip()
+                # Read input on a worker thread so background tasks keep running
+                user_input = (await loop.run_in_executor(None, input, "You: ")).strip()
                 
                 # Check for exit commands
                 if user_input.lower() in ['done', 'exit', 'quit', 'bye']:
@@ -67,26 +79,25 @@ class ConversationalChatbot:
                 # Add user message to history
                 self.add_to_history("user", user_input)
                 
-                # Generate response
-                print("\nThinking...\n")
-                response = await self.llm.generate_response(
-                    user_input, 
-                    use_rag=True,
-                    conversation_history=self.conversation_history
-                )
+                # Stream the response as it is generated
+                print("\nAssistant: ", end="", flush=True)
+                chunks = []
+                async for token in self._generate(user_input):
+                    sys.stdout.write(token)
+                    sys.stdout.flush()
+                    chunks.append(token)
+                response = "".join(chunks).strip()
                 
                 if response:
                     # Add assistant response to history
                     self.add_to_history("assistant", response)
-                    
-                    # Print response
-                    print(f"Assistant: {response}\n")
+                    print("\n")
                 else:
-                    print("Assistant: I apologize, but I couldn't generate a response. Please try again.\n")
+                    print("I apologize, but I couldn't generate a response. Please try again.\n")
                 
                 print("-" * 80 + "\n")
                 
-            except KeyboardInterrupt:
+            except (KeyboardInterrupt, EOFError):
                 print("\n\nInterrupted. Goodbye!\n")
                 break
             except Exception as e:
@@ -101,18 +112,14 @@ async def main():
     print("\nInitializing IIITM Information Assistant...")
     print("=" * 80)
     
-    # Initialize RAG
-    print("\nLoading knowledge base...")
+    # Initialize RAG and reranker concurrently; they load independent models
+    print("\nLoading knowledge base and reranker...")
     rag = RAGComponent(config)
-    await rag.initialize()
-    stats = await rag.get_stats()
-    print(f"✓ Loaded {stats['total_documents']} documents")
-    
-    # Initialize Reranker
-    print("\nreranker...")
     rag_config = config.get('rag', {})
     reranker = RerankerComponent(rag_config)
-    await reranker.initialize()
+    await asyncio.gather(rag.initialize(), reranker.initialize())
+    stats = await rag.get_stats()
+    print(f"✓ Loaded {stats['total_documents']} documents")
     print("✓ Reranker ready")
     
     # Initialize LLM
@@ -130,11 +137,21 @@ async def main():
     print("\n" + "=" * 80)
     
     # Start chatbot
-    chatbot = ConversationalChatbot(llm, rag)
+    llm_config = config.get('llm', {})
+    dispatcher = None
+    if llm_config.get('use_batch_dispatcher', False):
+        dispatcher = BatchedLLMDispatcher(
+            llm,
+            max_concurrent=llm_config.get('batch_max_concurrent', 8),
+            max_wait_ms=llm_config.get('batch_max_wait_ms', 30)
+        )
+    chatbot = ConversationalChatbot(llm, rag, dispatcher=dispatcher)
     await chatbot.chat()
     
     # Cleanup
     print("Cleaning up...")
+    if dispatcher:
+        await dispatcher.close()
     await llm.cleanup()
     await rag.cleanup()
     await reranker.cleanup()
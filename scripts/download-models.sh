@@ -21,6 +21,13 @@ echo "✅ Whisper models will be downloaded automatically on first use"
 echo "📥 Downloading sentence transformer models..."
 echo "✅ Sentence transformer models will be downloaded automatically on first use"
 
+# Download YuNet face detection model
+echo "📥 Downloading YuNet face detection model..."
+if [ ! -f face_detection_yunet_2023mar.onnx ]; then
+    wget -q https://github.com/opencv/opencv_zoo/raw/main/models/face_detection_yunet/face_detection_yunet_2023mar.onnx
+fi
+echo "✅ YuNet face detector ready"
+
 # Download Piper TTS models (if needed)
 echo "📥 Setting up TTS models..."
 mkdir -p tts
@@ -41,6 +48,7 @@ echo "📊 Model sizes:"
 echo "  - TinyLlama 1.1B: ~637MB (Q4_K_M quantized)"
 echo "  - Whisper base: ~74MB (downloaded on first use)"
 echo "  - Sentence transformers: ~23MB (downloaded on first use)"
+echo "  - YuNet face detector: ~230KB"
 echo "  - TTS models: ~20MB each (placeholder files created)"
 echo "  - Total: ~754MB (fits in Pi 4 4GB RAM)"
 echo ""
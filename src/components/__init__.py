@@ -4,9 +4,11 @@
 __all__ = [
     'ASRComponent',
     'FaceDetector',
+    'FaissVectorIndex',
     'LLMComponent',
     'RAGComponent',
     'RerankerComponent',
+    'SemanticCache',
     'SessionManager',
     'TTSComponent',
 ]
@@ -19,6 +21,9 @@ def __getattr__(name):
     elif name == 'FaceDetector':
         from .face_detection import FaceDetector
         return FaceDetector
+    elif name == 'FaissVectorIndex':
+        from .vector_index import FaissVectorIndex
+        return FaissVectorIndex
     elif name == 'LLMComponent':
         from .llm_inference import LLMComponent
         return LLMComponent
@@ -28,6 +33,9 @@ def __getattr__(name):
     elif name == 'RerankerComponent':
         from .reranker import RerankerComponent
         return RerankerComponent
+    elif name == 'SemanticCache':
+        from .semantic_cache import SemanticCache
+        return SemanticCache
     elif name == 'SessionManager':
         from .session_manager import SessionManager
         return SessionManager
@@ -1,18 +1,36 @@
 """
 Automatic Speech Recognition (ASR) Component using Whisper.
-Simplified implementation for initial development.
+Runs on faster-whisper (CTranslate2) so the model can use int8 kernels on CPU.
 """
 
 import asyncio
 import logging
-import tempfile
-from pathlib import Path
+import threading
+from math import gcd
 from typing import Optional
-import whisper
+from faster_whisper import WhisperModel
 import numpy as np
 
+try:
+    from scipy.signal import resample_poly
+except ImportError:  # only needed for non-16 kHz input
+    resample_poly = None
+
 logger = logging.getLogger(__name__)
 
+# Whisper models are trained on 16 kHz mono audio
+WHISPER_SAMPLE_RATE = 16000
+# Whisper works on 30 s windows
+WHISPER_N_SAMPLES = 30 * WHISPER_SAMPLE_RATE
+
+# whisper_precision config values -> CTranslate2 compute types
+COMPUTE_TYPES = {
+    "float32": "float32",
+    "float16": "float16",
+    "int8": "int8",
+    "int8_float16": "int8_float16",
+}
+
 
 class ASRComponent:
     """ASR component using Whisper for speech-to-text conversion."""
@@ -20,27 +38,66 @@ class ASRComponent:
     def __init__(self, config):
         self.config = config
         self.model = None
+        self.model_name = "base"
+        self.compute_type = "int8"
+        self.device = "cpu"
+        self.cpu_threads = 0
         self.is_initialized = False
+        self._model_lock = asyncio.Lock()
+        # Reusable staging buffer for dtype/channel conversion of incoming audio
+        self._audio_buf: Optional[np.ndarray] = None
+        self._audio_buf_lock = threading.Lock()
         
     async def initialize(self):
         """Initialize the ASR component."""
         try:
             logger.info("Initializing ASR component...")
 
-            model_name = self.config.get("models", {}).get("whisper_model", "base")
-            compute_type = self.config.get("models", {}).get("whisper_precision", "float32")
+            models_cfg = self.config.get("models", {})
+            model_name = models_cfg.get("whisper_model", "base")
+            precision = models_cfg.get("whisper_precision", "int8")
+            compute_type = COMPUTE_TYPES.get(precision)
+            if compute_type is None:
+                logger.warning(f"Unknown whisper_precision '{precision}', falling back to int8")
+                compute_type = "int8"
+            self.compute_type = compute_type
 
-            logger.info(f"Loading Whisper model: {model_name} (dtype={compute_type})")
+            self.model_name = model_name
+            self.device = models_cfg.get("whisper_device", "cpu")
+            # 0 lets CTranslate2 pick the thread count
+            self.cpu_threads = self.config.get("performance", {}).get("asr_threads", 0)
 
-            self.model = whisper.load_model(model_name)
+            self._audio_buf = np.zeros(WHISPER_N_SAMPLES, dtype=np.float32)
 
+            # Weights are loaded on first transcription so sessions that never
+            # use speech input don't pay the startup time and memory.
             self.is_initialized = True
-            logger.info("ASR component initialized successfully")
+            logger.info("ASR component initialized successfully (model loads on first use)")
             
         except Exception as e:
             logger.error(f"Failed to initialize ASR: {e}")
             raise
     
+    async def _ensure_model(self):
+        """Load the Whisper model on first use."""
+        if self.model is not None:
+            return
+        async with self._model_lock:
+            if self.model is not None:
+                return
+            logger.info(f"Loading Whisper model: {self.model_name} (device={self.device}, compute_type={self.compute_type})")
+            loop = asyncio.get_running_loop()
+            self.model = await loop.run_in_executor(None, self._load_model)
+            logger.info("Whisper model loaded")
+
+    def _load_model(self) -> WhisperModel:
+        return WhisperModel(
+            self.model_name,
+            device=self.device,
+            compute_type=self.compute_type,
+            cpu_threads=self.cpu_threads,
+        )
+
     async def transcribe_audio(self, audio_data: np.ndarray, sample_rate: int = 16000) -> Optional[str]:
         """
         Transcribe audio data to text.
@@ -59,30 +116,79 @@ class ASRComponent:
         
         try:
             logger.debug("Transcribing audio...")
+            await self._ensure_model()
             
-            # save audio to temporary wav file
-            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
-                temp_path = Path(tmp.name)
-                
-                # convert numpy array to audio file
-                import soundfile as sf
-                sf.write(temp_path, audio_data, sample_rate)
-                
-                # transcribe
-                result = self.model.transcribe(str(temp_path))
-                
-                # clean up temporary file
-                temp_path.unlink(missing_ok=True)
-                
-                text = result.get("text", "").strip()
-                logger.info(f"ASR (audio buffer) → {text}")
-                
-                return text or None
-                
+            # whisper accepts a float32 ndarray directly, no wav/ffmpeg round-trip needed
+            loop = asyncio.get_running_loop()
+            text = await loop.run_in_executor(None, self._transcribe, audio_data, sample_rate)
+            logger.info(f"ASR (audio buffer) → {text}")
+
+            return text or None
+
         except Exception as e:
             logger.error(f"Error in audio transcription: {e}")
             return None
     
+    def _prepare_audio(self, audio_data: np.ndarray, sample_rate: int) -> np.ndarray:
+        """Convert audio to the 16 kHz mono float32 layout Whisper expects.
+
+        Integer PCM is scaled into [-1, 1]. 16 kHz input that needs a dtype or
+        channel conversion is written into the preallocated staging buffer
+        instead of a fresh array; callers must hold ``_audio_buf_lock`` until
+        the model has consumed the result.
+        """
+        audio = np.asarray(audio_data)
+        scale = 1.0 / np.iinfo(audio.dtype).max if np.issubdtype(audio.dtype, np.integer) else None
+
+        if sample_rate == WHISPER_SAMPLE_RATE:
+            if audio.ndim == 1 and audio.dtype == np.float32:
+                return audio
+            buf = self._audio_buf
+            if buf is not None and audio.shape[0] <= buf.size:
+                out = buf[:audio.shape[0]]
+                if audio.ndim > 1:
+                    # downmix (frames, channels) recordings to mono
+                    np.mean(audio, axis=1, dtype=np.float32, out=out)
+                else:
+                    np.copyto(out, audio, casting="unsafe")
+                if scale is not None:
+                    out *= scale
+                return out
+
+        audio = audio.astype(np.float32, copy=False)
+        if scale is not None:
+            audio = audio * np.float32(scale)
+
+        # downmix (frames, channels) recordings to mono
+        if audio.ndim > 1:
+            audio = audio.mean(axis=1, dtype=np.float32)
+
+        if sample_rate != WHISPER_SAMPLE_RATE:
+            if resample_poly is None:
+                raise RuntimeError(f"scipy is required to resample {sample_rate} Hz audio to {WHISPER_SAMPLE_RATE} Hz")
+            factor = gcd(WHISPER_SAMPLE_RATE, sample_rate)
+            audio = resample_poly(
+                audio, WHISPER_SAMPLE_RATE // factor, sample_rate // factor
+            ).astype(np.float32)
+
+        return audio
+
+    def _transcribe(self, audio, sample_rate: Optional[int] = None) -> str:
+        """Run the model on a file path or an in-memory buffer and join the segments.
+
+        Blocking; callers run it in an executor so the event loop stays free.
+        """
+        if isinstance(audio, str):
+            segments, _info = self.model.transcribe(audio)
+        else:
+            with self._audio_buf_lock:
+                prepared = self._prepare_audio(audio, sample_rate or WHISPER_SAMPLE_RATE)
+                # features are extracted eagerly here, so the staging buffer is
+                # free again once transcribe() returns
+                segments, _info = self.model.transcribe(prepared)
+        # segments is a lazy generator; decoding happens while we iterate it
+        return "".join(segment.text for segment in segments).strip()
+
     async def transcribe_file(self, audio_file_path: str) -> Optional[str]:
         """
         Convert an audio file (wav/mp3/etc) to text using Whisper.
@@ -94,9 +200,10 @@ class ASRComponent:
         
         try:
             logger.debug(f"Transcribing audio file: {audio_file_path}")
+            await self._ensure_model()
             
-            result = self.model.transcribe(audio_file_path)
-            text = result.get("text", "").strip()
+            loop = asyncio.get_running_loop()
+            text = await loop.run_in_executor(None, self._transcribe, audio_file_path)
             
             logger.info(f"ASR (audio buffer) → {text}")
             return text or None
@@ -1,21 +1,34 @@
 """
 Face Detection Component using OpenCV.
 
-This module no longer depends on MediaPipe. It uses OpenCV Haar cascades
-and opens the video device directly (defaults to /dev/video0). If OpenCV
-or the camera cannot be initialized, the detector will be marked disabled
-and methods will log warnings and return safely instead of raising at
-import time.
+This module no longer depends on MediaPipe. It uses OpenCV's YuNet DNN
+detector (cv2.FaceDetectorYN) when the ONNX model is available, falling back
+to Haar cascades otherwise, and opens the video device directly (defaults to
+/dev/video0) the first time frames are needed. If OpenCV or the camera cannot
+be initialized, the detector will be marked disabled and methods will log warnings and return safely instead of
+raising at import time.
 """
 
 import time
 import logging
-from typing import Optional, Tuple, List
+import threading
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
 
 from utils.config import load_config
 
 logger = logging.getLogger(__name__)
 
+# Parsed Haar cascades keyed by XML path. Classifiers are read-only during
+# detectMultiScale, so instances can share them instead of re-parsing the XML.
+_CASCADE_CACHE: dict = {}
+
+DEFAULT_YUNET_MODEL = "data/models/face_detection_yunet_2023mar.onnx"
+
+_NO_DETECTIONS = np.empty((0, 4), dtype=np.int32)
+
 
 class FaceDetector:
     def __init__(self, config):
@@ -25,6 +38,20 @@ class FaceDetector:
         except Exception:
             self.confidence = 0.6
 
+        # Frames wider than this are downscaled before detection; boxes are
+        # scaled back so drawing/display still use the full-resolution frame.
+        try:
+            self.detect_width = int(face_cfg.get("detect_width", 320))
+        except Exception:
+            self.detect_width = 320
+
+        # Presence changes slowly, so monitor_session only runs detection a
+        # few times per second and just drains the camera in between.
+        try:
+            self._detect_interval = 1.0 / float(face_cfg.get("detect_fps", 5.0))
+        except Exception:
+            self._detect_interval = 0.2
+
         # Determine camera device. Prefer explicit device path; fall back to camera_index;
         # default to /dev/video0 which is common on Linux systems.
         hw = config.get("hardware", {})
@@ -36,6 +63,20 @@ class FaceDetector:
 
         self.device = device
 
+        # Presence detection doesn't need HD frames; request a small, low-rate
+        # stream to cut USB bandwidth and YUV->BGR conversion work.
+        self.capture_width = face_cfg.get("capture_width", 320)
+        self.capture_height = face_cfg.get("capture_height", 240)
+        self.capture_fps = face_cfg.get("capture_fps", 10)
+        self.capture_buffer_size = face_cfg.get("capture_buffer_size", 1)
+
+        # Frames are read on a background thread into a single-slot buffer so
+        # camera decode overlaps with detection; consumers take the newest frame.
+        self._frame_cond = threading.Condition()
+        self._latest = None
+        self._stop = threading.Event()
+        self._capture_thread = None
+
         # Delay importing cv2 to avoid ImportError at module import time.
         try:
             import cv2
@@ -50,8 +91,34 @@ class FaceDetector:
         self.cv2 = cv2
         self.disabled = False
 
-        # Open camera (try device path first, fall back to index)
+        # OpenCV's transparent API offloads cvtColor/detectMultiScale to an
+        # OpenCL device (e.g. the kiosk's iGPU) when frames are wrapped in UMat.
+        self.use_opencl = False
+        if face_cfg.get("use_opencl", True):
+            try:
+                if cv2.ocl.haveOpenCL():
+                    cv2.ocl.setUseOpenCL(True)
+                    self.use_opencl = cv2.ocl.useOpenCL()
+            except Exception as e:
+                logger.debug("OpenCL unavailable, running detection on CPU: %s", e)
+        if self.use_opencl:
+            logger.info("Face detection using OpenCL acceleration")
+
+        # The camera is opened on first use (wait_for_face/monitor_session/resume),
+        # so processes that only construct a detector never decode frames.
         self.cap = None
+
+        # Prefer the YuNet DNN detector; fall back to a Haar cascade when the
+        # model file or cv2.FaceDetectorYN (OpenCV >= 4.5.4) is unavailable.
+        self.detector = None
+        self.detector_type = None
+        self._load_yunet(face_cfg.get("yunet_model_path", DEFAULT_YUNET_MODEL))
+        if self.detector is None:
+            self._load_haar(face_cfg.get("cascade_path"))
+
+    def _open_capture(self) -> bool:
+        """Open the camera (device path first, then numeric index) and start the capture thread."""
+        cv2 = self.cv2
         try:
             # If device is an integer-like value, VideoCapture will accept it; otherwise try path
             try:
@@ -72,63 +139,174 @@ class FaceDetector:
                 logger.warning("Unable to open video device %s — face detection disabled.", self.device)
                 self.disabled = True
                 self.cap = None
+                return False
+
+            self._configure_capture()
+            self._start_capture_thread()
+            return True
         except Exception as e:
             logger.warning("Error opening video device %s: %s — face detection disabled.", self.device, e)
             self.disabled = True
             self.cap = None
+            return False
 
-        # Load Haar cascade for face detection. Not fatal if it fails; we'll keep running
-        # but return no detections.
-        self.detector = None
+    def _configure_capture(self):
+        """Apply capture size/FPS/buffer hints. Drivers may ignore unsupported values."""
+        cv2 = self.cv2
+        props = (
+            (cv2.CAP_PROP_FRAME_WIDTH, self.capture_width),
+            (cv2.CAP_PROP_FRAME_HEIGHT, self.capture_height),
+            (cv2.CAP_PROP_FPS, self.capture_fps),
+            # a single-slot buffer drops stale frames instead of queueing them
+            (cv2.CAP_PROP_BUFFERSIZE, self.capture_buffer_size),
+        )
+        for prop, value in props:
+            if value is None:
+                continue
+            try:
+                self.cap.set(prop, value)
+            except Exception as e:
+                logger.debug("Camera property %s=%s not applied: %s", prop, value, e)
+
+    def _load_yunet(self, model_path: Optional[str]):
+        cv2 = self.cv2
+        if not model_path or not hasattr(cv2, "FaceDetectorYN"):
+            return
+        if not Path(model_path).exists():
+            logger.info("YuNet model not found at %s — using Haar cascade instead.", model_path)
+            return
         try:
-            cascade_path = face_cfg.get("cascade_path") or (cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
-            self.detector = cv2.CascadeClassifier(cascade_path)
-            if hasattr(self.detector, "empty") and self.detector.empty():
-                logger.warning("Failed to load Haar cascade from %s — detections will be disabled.", cascade_path)
-                self.detector = None
+            # Input size is a placeholder; it is reset per frame in _detect_face.
+            self.detector = cv2.FaceDetectorYN.create(
+                model_path, "", (320, 240), score_threshold=self.confidence
+            )
+            self.detector_type = "yunet"
         except Exception as e:
-            logger.warning("Error initializing Haar cascade: %s — detections will be disabled.", e)
+            logger.warning("Error initializing YuNet detector: %s — using Haar cascade instead.", e)
             self.detector = None
 
-    def _get_frame(self) -> Optional["object"]:
-        if self.disabled or not self.cap:
-            return None
+    def _load_haar(self, cascade_path: Optional[str]):
+        # Not fatal if it fails; we'll keep running but return no detections.
+        cv2 = self.cv2
         try:
-            ret, frame = self.cap.read()
-            if not ret:
-                return None
-            return frame
+            cascade_path = cascade_path or (cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+            self.detector = _CASCADE_CACHE.get(cascade_path)
+            if self.detector is None:
+                self.detector = cv2.CascadeClassifier(cascade_path)
+                if hasattr(self.detector, "empty") and self.detector.empty():
+                    logger.warning("Failed to load Haar cascade from %s — detections will be disabled.", cascade_path)
+                    self.detector = None
+                else:
+                    _CASCADE_CACHE[cascade_path] = self.detector
+            if self.detector is not None:
+                self.detector_type = "haar"
         except Exception as e:
-            logger.warning("Error reading frame from %s: %s", self.device, e)
-            return None
+            logger.warning("Error initializing Haar cascade: %s — detections will be disabled.", e)
+            self.detector = None
+
+    def _start_capture_thread(self):
+        self._stop.clear()
+        self._capture_thread = threading.Thread(target=self._capture_loop, name="face-capture", daemon=True)
+        self._capture_thread.start()
+
+    def _stop_capture_thread(self):
+        self._stop.set()
+        thread = self._capture_thread
+        if thread is not None and thread.is_alive():
+            thread.join(timeout=1.0)
+        self._capture_thread = None
+        with self._frame_cond:
+            self._latest = None
+
+    def _capture_loop(self):
+        """Continuously read frames, keeping only the newest one."""
+        cap = self.cap
+        while not self._stop.is_set():
+            try:
+                ret, frame = cap.read()
+            except Exception as e:
+                logger.warning("Error reading frame from %s: %s", self.device, e)
+                ret, frame = False, None
+            if not ret:
+                time.sleep(0.1)
+                continue
+            with self._frame_cond:
+                self._latest = frame
+                self._frame_cond.notify()
 
-    def _detect_face(self, frame) -> Tuple[bool, List[Tuple[int, int, int, int]]]:
-        """Return (face_found, detections) where detections is list of (x,y,w,h)."""
+    def _get_frame(self, timeout: float = 0.5) -> Optional["object"]:
+        """Take the newest captured frame, waiting up to `timeout` for a fresh one."""
+        if self.disabled or self._capture_thread is None:
+            return None
+        with self._frame_cond:
+            if self._latest is None:
+                self._frame_cond.wait(timeout)
+            frame, self._latest = self._latest, None
+        return frame
+
+    def _detect_face(self, frame) -> Tuple[bool, np.ndarray]:
+        """Return (face_found, detections) where detections is an (N, 4) int32 array of (x,y,w,h)."""
         if self.disabled or not self.detector:
-            return False, []
+            return False, _NO_DETECTIONS
 
         try:
-            gray = self.cv2.cvtColor(frame, self.cv2.COLOR_BGR2GRAY)
-            rects = self.detector.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5)
-            detections = [tuple(map(int, r)) for r in rects] if hasattr(rects, '__len__') and len(rects) else []
-            return len(detections) > 0, detections
+            scale = 1.0
+            small = frame
+            if self.detect_width and frame.shape[1] > self.detect_width:
+                scale = self.detect_width / float(frame.shape[1])
+                small = self.cv2.resize(frame, None, fx=scale, fy=scale, interpolation=self.cv2.INTER_AREA)
+
+            if self.detector_type == "yunet":
+                detections = self._detect_yunet(small)
+            else:
+                detections = self._detect_haar(small)
+
+            if scale != 1.0 and detections.shape[0] > 0:
+                detections = np.rint(detections / scale).astype(np.int32)
+            return detections.shape[0] > 0, detections
         except Exception as e:
             logger.warning("Error during face detection: %s", e)
-            return False, []
+            return False, _NO_DETECTIONS
+
+    def _detect_yunet(self, frame) -> np.ndarray:
+        # YuNet takes the BGR frame directly, no grayscale conversion needed
+        h, w = frame.shape[:2]
+        self.detector.setInputSize((w, h))
+        _, faces = self.detector.detect(frame)
+        if faces is None:
+            return _NO_DETECTIONS
+        return faces[:, :4].astype(np.int32)
+
+    def _detect_haar(self, frame) -> np.ndarray:
+        if self.use_opencl:
+            frame = self.cv2.UMat(frame)
+        gray = self.cv2.cvtColor(frame, self.cv2.COLOR_BGR2GRAY)
+        rects = self.detector.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5)
+        # detectMultiScale returns an int32 (N, 4) ndarray, or an empty tuple when nothing is found
+        if isinstance(rects, np.ndarray) and rects.size:
+            return rects.astype(np.int32, copy=False)
+        return _NO_DETECTIONS
 
     def _draw_boxes(self, frame, detections):
-        if not detections:
+        if len(detections) == 0:
             return
-        h, w = frame.shape[:2]
-        for (x, y, ww, hh) in detections:
+        for (x, y, ww, hh) in detections.tolist():
             try:
                 self.cv2.rectangle(frame, (x, y), (x + ww, y + hh), (0, 255, 0), 2)
             except Exception:
                 pass
 
+    def _ensure_capture(self) -> bool:
+        """Open the camera and start the capture thread if they aren't running yet."""
+        if self.disabled:
+            return False
+        if self.cap is not None:
+            return True
+        return self._open_capture()
+
     def wait_for_face(self):
         """Blocking loop until a face is detected. Returns True if a face was detected."""
-        if self.disabled:
+        if not self._ensure_capture():
             logger.warning("FaceDetector disabled — cannot wait for face.")
             return False
 
@@ -159,12 +337,13 @@ class FaceDetector:
 
     def monitor_session(self, timeout=10):
         """Returns False if no face is detected for <timeout> seconds."""
-        if self.disabled:
+        if not self._ensure_capture():
             logger.warning("FaceDetector disabled — cannot monitor session.")
             return False
 
         print("Session Started — Monitoring face presence...")
         last_seen = time.time()
+        last_detect = 0.0
 
         while True:
             frame = self._get_frame()
@@ -172,20 +351,24 @@ class FaceDetector:
                 time.sleep(0.1)
                 continue
 
-            face_found, detections = self._detect_face(frame)
+            now = time.time()
+            # frames between detection ticks are simply dropped
+            if now - last_detect >= self._detect_interval:
+                last_detect = now
+                face_found, detections = self._detect_face(frame)
 
-            if face_found:
-                last_seen = time.time()
-                self._draw_boxes(frame, detections)
+                if face_found:
+                    last_seen = now
+                    self._draw_boxes(frame, detections)
 
-            status_text = "Face detected" if face_found else "No face"
-            try:
-                self.cv2.putText(frame, status_text, (20, 40),
-                                 self.cv2.FONT_HERSHEY_SIMPLEX, 1, (0,255,0) if face_found else (0,0,255), 2)
-                self.cv2.imshow("Session Monitoring", frame)
-            except Exception:
-                # ignore display errors
-                pass
+                status_text = "Face detected" if face_found else "No face"
+                try:
+                    self.cv2.putText(frame, status_text, (20, 40),
+                                     self.cv2.FONT_HERSHEY_SIMPLEX, 1, (0,255,0) if face_found else (0,0,255), 2)
+                    self.cv2.imshow("Session Monitoring", frame)
+                except Exception:
+                    # ignore display errors
+                    pass
 
             if time.time() - last_seen > timeout:
                 print("No face detected for", timeout, "seconds — Ending Session")
@@ -199,8 +382,33 @@ class FaceDetector:
 
         return False
 
+    def pause(self):
+        """Close the camera while it isn't needed (e.g. during the LLM exchange).
+
+        Stops the USB stream so frames aren't DMA'd into kernel buffers nobody
+        reads. Waiting/monitoring reopens it; resume() does so ahead of time.
+        """
+        if self.disabled or self.cap is None:
+            return
+        self._stop_capture_thread()
+        try:
+            self.cap.release()
+        except Exception:
+            pass
+        self.cap = None
+
+    def resume(self) -> bool:
+        """Reopen the camera after pause(). Returns True if capture is running."""
+        if self.cv2 is None or self.detector is None:
+            return False
+        if self.cap is not None:
+            return True
+        self.disabled = False
+        return self._open_capture()
+
     def release(self):
         try:
+            self._stop_capture_thread()
             if getattr(self, 'cap', None):
                 try:
                     self.cap.release()
@@ -222,6 +430,9 @@ if __name__ == "__main__":
     session_start = face.wait_for_face()
 
     if session_start:
+        # The conversation (ASR/LLM/TTS) runs here; the camera is closed meanwhile
+        face.pause()
+        face.resume()
         face.monitor_session(timeout=10)
 
     face.release()
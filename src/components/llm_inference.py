@@ -1,10 +1,38 @@
+import asyncio
+import hashlib
+import heapq
+import json
 import logging
-import requests
-from typing import Optional, List, Dict
+import re
+from collections import OrderedDict
+import aiohttp
+from components.semantic_cache import SemanticCache
+from typing import AsyncIterator, Optional, List, Dict, Tuple
 import time
 
+try:
+    import orjson
+
+    _json_dumps = orjson.dumps
+    _json_loads = orjson.loads
+except ImportError:  # stdlib fallback
+    def _json_dumps(obj) -> bytes:
+        return json.dumps(obj).encode()
+
+    _json_loads = json.loads
+
 logger = logging.getLogger(__name__)
 
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+EXACT_CACHE_MAX_ENTRIES = 4096
+EXACT_CACHE_MAX_TEMPERATURE = 0.3  # above this, sampling varies enough that reuse is wrong
+# Per-document content budget (~150 tokens), applied once after retrieval so the reranker
+# scores exactly the text the LLM will see; five of these fit TinyLlama's 2048-token context
+DOC_MAX_CHARS = 600
+
+NO_CONTEXT_RESPONSE = "I don't have that information. Could you rephrase or ask about IIITM Gwalior specifically?"
+
 
 class LLMComponent:
     def __init__(self, config, rag_component=None, reranker_component=None):
@@ -12,11 +40,30 @@ class LLMComponent:
         self.rag_component = rag_component
         self.reranker_component = reranker_component
         self.server_url = None
+        self._session: Optional[aiohttp.ClientSession] = None
         self.max_tokens = None
         self.temperature = None
         self.is_initialized = False
         self.use_rag = True
         self.use_reranker = config.get('rag', {}).get('use_reranker', True) if config else True
+        self._system_prompt = self._build_system_prompt()  # constant; built once
+        self.short_circuit_empty_rag = config.get('llm', {}).get('short_circuit_empty_rag', True) if config else True
+        llm_config = config.get('llm', {}) if config else {}
+        self.response_cache: Optional[SemanticCache] = None
+        self._exact_cache: "OrderedDict[str, str]" = OrderedDict()  # prompt hash -> response, LRU first
+        # Completion coalescing for llama.cpp servers with parallel slots (1 = disabled)
+        self.completion_batch_size = max(1, int(llm_config.get('completion_batch_size', 1)))
+        self.completion_batch_window = llm_config.get('completion_batch_window_ms', 20) / 1000.0
+        self._completion_queue: Optional[asyncio.Queue] = None
+        self._batch_worker_task: Optional[asyncio.Task] = None
+        self._inflight_batches: set = set()
+        if llm_config.get('semantic_cache', True):
+            # Paraphrased questions ("hours today?" / "what are your timings") skip RAG + LLM
+            self.response_cache = SemanticCache(
+                threshold=llm_config.get('semantic_cache_threshold', 0.92),
+                max_entries=llm_config.get('semantic_cache_max_entries', 10000),
+                ttl_seconds=llm_config.get('semantic_cache_ttl_seconds', 3600)
+            )
         
     async def initialize(self):
         try:
@@ -25,15 +72,23 @@ class LLMComponent:
             self.server_url = llm_config.get('server_url', 'http://localhost:8080')
             self.max_tokens = llm_config.get('max_tokens', 150)
             self.temperature = llm_config.get('temperature', 0.7)
+            # One pooled session for the component's lifetime so connections are reused
+            if self._session is None or self._session.closed:
+                self._session = aiohttp.ClientSession(
+                    connector=aiohttp.TCPConnector(limit=100, limit_per_host=32, keepalive_timeout=60)
+                )
             try:
-                response = requests.get(f"{self.server_url}/v1/models", timeout=5)
-                if response.status_code == 200:
-                    logger.info(f"Llama.cpp server is running at {self.server_url}")
-                    self.is_initialized = True
-                else:
-                    logger.warning(f"Llama.cpp server responded with status {response.status_code}")
-                    self.is_initialized = False
-            except requests.exceptions.RequestException as e:
+                async with self._session.get(
+                    f"{self.server_url}/v1/models",
+                    timeout=aiohttp.ClientTimeout(total=5)
+                ) as response:
+                    if response.status == 200:
+                        logger.info(f"Llama.cpp server is running at {self.server_url}")
+                        self.is_initialized = True
+                    else:
+                        logger.warning(f"Llama.cpp server responded with status {response.status}")
+                        self.is_initialized = False
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
                 logger.warning(f"Llama.cpp server not available at {self.server_url}: {e}")
                 logger.info("Will attempt to start server or use fallback mode")
                 self.is_initialized = False
@@ -47,12 +102,31 @@ class LLMComponent:
                 await self.reranker_component.initialize()
                 logger.info("Reranker component initialized successfully")
             
+            if self.is_initialized:
+                await self._warmup()
+            
             logger.info("LLM component initialization complete")
             
         except Exception as e:
             logger.error(f"Failed to initialize LLM: {e}")
             raise
     
+    async def _warmup(self):
+        """Request a single token so model pages and KV buffers are ready before the first user."""
+        payload = self._build_payload(f"{self._system_prompt}\n\nQuestion: Hello\nAnswer:")
+        payload["max_tokens"] = 1
+        try:
+            async with self._session.post(
+                f"{self.server_url}/v1/completions",
+                data=_json_dumps(payload),
+                headers=JSON_HEADERS,
+                timeout=aiohttp.ClientTimeout(total=60)
+            ) as response:
+                await response.read()
+            logger.info("LLM server warmed up")
+        except Exception as e:
+            logger.warning(f"LLM warm-up request failed: {e}")
+
     def _build_system_prompt(self) -> str:
         return """You are an IIITM Gwalior information assistant.
 Answer questions using ONLY the CONTEXT below. Be brief and accurate.
@@ -67,89 +141,142 @@ Do NOT start with "According to" or "Based on" - answer directly."""
         # IMPORTANT: Don't re-sort if using reranked results!
         # Reranked results are already in optimal order
         if not use_rerank_order:
-            # Only sort by similarity if NOT reranked
-            sorted_results = sorted(rag_results, key=lambda x: x.get('similarity', 0), reverse=True)
+            # Only rank by similarity if NOT reranked; partial top-5 instead of a full sort
+            sorted_results = heapq.nlargest(5, rag_results, key=lambda doc: doc.get('similarity', 0))
         else:
             # Use the order as-is (already reranked)
             sorted_results = rag_results
         
-        context_parts = ["CONTEXT:"]
-        for i, doc in enumerate(sorted_results[:5], 1):
-            # Include source attribution for better traceability
-            source = doc.get('title', 'Unknown')
-            content = doc['content'][:600]  # Slightly longer chunks
-            
-            # Show rerank score if available, otherwise similarity
-            score_info = ""
-            if 'rerank_score' in doc:
-                score_info = f" (relevance: {doc['rerank_score']:.3f})"
-            elif 'similarity' in doc:
-                score_info = f" (similarity: {doc['similarity']:.3f})"
-            
-            context_parts.append(f"\n[Source {i}: {source}{score_info}]\n{content}")
-        
-        return "\n".join(context_parts)
+        # Include source attribution for better traceability
+        segments = [
+            f"\n[Source {i}: {doc.get('title', 'Unknown')}{self._format_score(doc)}]\n{doc['content']}"
+            for i, doc in enumerate(sorted_results[:5], 1)
+        ]
+        return "CONTEXT:\n" + "\n".join(segments)
+
+    @staticmethod
+    def _format_score(doc: Dict) -> str:
+        """Show rerank score if available, otherwise similarity."""
+        if 'rerank_score' in doc:
+            return f" (relevance: {doc['rerank_score']:.3f})"
+        if 'similarity' in doc:
+            return f" (similarity: {doc['similarity']:.3f})"
+        return ""
 
     def _build_prompt(self, user_query: str, rag_context: str, conversation_history: Optional[List[Dict]] = None) -> str:
-        prompt_parts = [self._build_system_prompt()]
         if rag_context:
-            prompt_parts.append(f"\n{rag_context}")
-        prompt_parts.append(f"\n\nQuestion: {user_query}")
-        prompt_parts.append("Answer:")
-        return "\n".join(prompt_parts)
+            return f"{self._system_prompt}\n\n{rag_context}\n\n\nQuestion: {user_query}\nAnswer:"
+        return f"{self._system_prompt}\n\n\nQuestion: {user_query}\nAnswer:"
+
+    async def _embed_query(self, prompt: str):
+        """Embed the query with the RAG model, or return None when RAG is unavailable."""
+        if not (self.rag_component and self.rag_component.is_initialized):
+            return None
+        return await self.rag_component.embed_query(prompt)
+
+    async def _prepare_query(self, prompt: str, use_rag: bool) -> Tuple[Optional[object], Optional[str]]:
+        """Embed the query (re-probing the server while it is marked down), then consult the response cache.
+
+        Returns (query embedding, cached response); either may be None.
+        """
+        embed = self._embed_query(prompt) if use_rag else asyncio.sleep(0)
+        if self.is_initialized:
+            # A single-slot server answers probes late while generating, so a slow probe
+            # proves nothing; only a failed connection marks it down (_mark_server_unavailable)
+            query_embedding = await embed
+        else:
+            query_embedding, server_ok = await asyncio.gather(embed, self.check_server_health())
+            if server_ok:
+                logger.info(f"LLM server available at {self.server_url}")
+                self.is_initialized = True
+        if query_embedding is not None and self.response_cache is not None:
+            return query_embedding, self.response_cache.lookup(query_embedding)
+        return query_embedding, None
+
+    def _is_out_of_scope(self, use_rag: bool, rag_results: Optional[List[Dict]]) -> bool:
+        """True when a working knowledge base found nothing, so the LLM would only decline."""
+        return bool(
+            self.short_circuit_empty_rag
+            and use_rag
+            and self.rag_component
+            and self.rag_component.is_initialized
+            and not rag_results
+        )
+
+    async def _retrieve_context(self, prompt: str, use_rag: bool = True, query_embedding=None) -> Tuple[str, Optional[List[Dict]]]:
+        """Search (and optionally rerank) the knowledge base and format the prompt context."""
+        rag_context = ""
+        rag_results = None
+        if use_rag and self.rag_component:
+            logger.info("Searching knowledge base...")
+            want_rerank = bool(self.use_reranker and self.reranker_component and self.reranker_component.is_initialized)
+            # Over-fetch a wider candidate pool only when the reranker will narrow it down;
+            # otherwise let the database return just the final top 5
+            rag_results = await self.rag_component.search(
+                prompt, 
+                limit=20 if want_rerank else 5,
+                similarity_threshold=0.3 if want_rerank else 0.5,
+                query_embedding=query_embedding
+            )
+            if rag_results:
+                logger.info(f"Found {len(rag_results)} relevant documents (top similarity: {rag_results[0]['similarity']:.3f})")
+                for doc in rag_results:
+                    doc['content'] = doc['content'][:DOC_MAX_CHARS]
+                
+                # Track if we used reranking
+                used_reranking = False
+                
+                # Apply reranking if available
+                if want_rerank:
+                    logger.info("Applying reranking to improve relevance...")
+                    rag_results = await self.reranker_component.rerank(
+                        query=prompt,
+                        documents=rag_results,
+                        top_k=5
+                    )
+                    if rag_results:
+                        used_reranking = True
+                        top_score = rag_results[0].get('rerank_score')
+                        top_score = f"{top_score:.3f}" if isinstance(top_score, (int, float)) else "N/A"
+                        logger.info(f"Reranked to top {len(rag_results)} documents (top rerank score: {top_score})")
+                        
+                        # DEBUG: Log reranked order
+                        logger.debug("Reranked document order:")
+                        for i, doc in enumerate(rag_results[:5], 1):
+                            logger.debug(f"  {i}. [Rerank: {doc.get('rerank_score', 0.0):.3f}] {doc.get('title', 'Unknown')[:50]}")
+                
+                # Format context - preserve rerank order!
+                rag_context = self._format_rag_context(rag_results, use_rerank_order=used_reranking)
+                
+                # DEBUG: Log what's being sent to LLM
+                logger.debug(f"Context being sent to LLM (first 500 chars):\n{rag_context[:500]}")
+            else:
+                logger.info("No relevant documents found in knowledge base")
+        return rag_context, rag_results
 
     async def generate_response(self, prompt: str, use_rag: bool = True, conversation_history: Optional[List[Dict]] = None) -> Optional[str]:
         try:
             start_time = time.time()
             logger.info(f"Processing query: {prompt}")
-            rag_context = ""
-            rag_results = None
-            if use_rag and self.rag_component:
-                logger.info("Searching knowledge base...")
-                # Retrieve more results initially (20) for better coverage
-                rag_results = await self.rag_component.search(
-                    prompt, 
-                    limit=20,  # Increased from 5 to 20 for reranking
-                    similarity_threshold=0.3  # Lowered threshold to get more candidates
-                )
-                if rag_results:
-                    logger.info(f"Found {len(rag_results)} relevant documents (top similarity: {rag_results[0]['similarity']:.3f})")
-                    
-                    # Track if we used reranking
-                    used_reranking = False
-                    
-                    # Apply reranking if available
-                    if self.use_reranker and self.reranker_component and self.reranker_component.is_initialized:
-                        logger.info("Applying reranking to improve relevance...")
-                        rag_results = await self.reranker_component.rerank(
-                            query=prompt,
-                            documents=rag_results,
-                            top_k=5
-                        )
-                        if rag_results:
-                            used_reranking = True
-                            logger.info(f"Reranked to top {len(rag_results)} documents (top rerank score: {rag_results[0].get('rerank_score', 'N/A'):.3f})")
-                            
-                            # DEBUG: Log reranked order
-                            logger.debug("Reranked document order:")
-                            for i, doc in enumerate(rag_results[:5], 1):
-                                logger.debug(f"  {i}. [Rerank: {doc.get('rerank_score', 0):.3f}] {doc.get('title', 'Unknown')[:50]}")
-                    else:
-                        # Fallback: take top 5 from the 20 results without reranking
-                        rag_results = rag_results[:5]
-                    
-                    # Format context - preserve rerank order!
-                    rag_context = self._format_rag_context(rag_results, use_rerank_order=used_reranking)
-                    
-                    # DEBUG: Log what's being sent to LLM
-                    logger.debug(f"Context being sent to LLM (first 500 chars):\n{rag_context[:500]}")
-                else:
-                    logger.info("No relevant documents found in knowledge base")
+            query_embedding, cached = await self._prepare_query(prompt, use_rag)
+            if cached:
+                logger.info(f"Semantic cache hit in {time.time() - start_time:.3f}s")
+                return cached
+            rag_context, rag_results = await self._retrieve_context(prompt, use_rag, query_embedding)
+            if self._is_out_of_scope(use_rag, rag_results):
+                logger.info("No knowledge-base matches; skipping LLM call")
+                return NO_CONTEXT_RESPONSE
             full_prompt = self._build_prompt(prompt, rag_context, conversation_history)
             logger.debug(f"Full prompt length: {len(full_prompt)} chars")
             if self.is_initialized:
                 logger.info("Generating response from LLM...")
-                response_text = await self._call_llm_server(full_prompt)
+                try:
+                    response_text, generated = await self._call_llm_server(full_prompt)
+                except aiohttp.ClientConnectionError as e:
+                    self._mark_server_unavailable(e)
+                    response_text, generated = self._generate_fallback_response(prompt, rag_results if use_rag else None), False
+                if generated and query_embedding is not None and self.response_cache is not None:
+                    self.response_cache.store(query_embedding, response_text)
             else:
                 logger.warning("LLM server not available, using fallback mode")
                 response_text = self._generate_fallback_response(prompt, rag_results if use_rag else None)
@@ -166,74 +293,223 @@ Do NOT start with "According to" or "Based on" - answer directly."""
             traceback.print_exc()
             return None
 
-    async def _call_llm_server(self, prompt: str) -> str:
+    def _build_payload(self, prompt: str, stream: bool = False) -> Dict:
+        return {
+            "prompt": prompt,
+            "max_tokens": self.max_tokens,
+            "temperature": self.temperature,
+            "top_p": 0.9,
+            "top_k": 40, 
+            "repeat_penalty": 1.1,
+            "stop": [
+                "User:", "Assistant:", 
+                "\n\nUser:", "\n\nAssistant:",
+                "===", "[END]", 
+                "\n\n\n"
+            ],
+            "stream": stream
+        }
+
+    async def stream_response(self, prompt: str, use_rag: bool = True, conversation_history: Optional[List[Dict]] = None) -> AsyncIterator[str]:
+        """Yield the response incrementally as the LLM server produces tokens.
+
+        Retrieval runs up front exactly as in generate_response; only the
+        completion is streamed. In fallback mode the whole answer is yielded once.
+        """
+        start_time = time.time()
+        logger.info(f"Processing query (streaming): {prompt}")
+        query_embedding, cached = await self._prepare_query(prompt, use_rag)
+        if cached:
+            logger.info("Semantic cache hit")
+            yield cached
+            return
+        rag_context, rag_results = await self._retrieve_context(prompt, use_rag, query_embedding)
+        if self._is_out_of_scope(use_rag, rag_results):
+            logger.info("No knowledge-base matches; skipping LLM call")
+            yield NO_CONTEXT_RESPONSE
+            return
+        if not self.is_initialized:
+            logger.warning("LLM server not available, using fallback mode")
+            yield self._generate_fallback_response(prompt, rag_results if use_rag else None)
+            return
+
+        full_prompt = self._build_prompt(prompt, rag_context, conversation_history)
+        payload = self._build_payload(full_prompt, stream=True)
         try:
-            payload = {
-                "prompt": prompt,
-                "max_tokens": self.max_tokens,
-                "temperature": self.temperature,
-                "top_p": 0.9,
-                "top_k": 40, 
-                "repeat_penalty": 1.1,
-                "stop": [
-                    "User:", "Assistant:", 
-                    "\n\nUser:", "\n\nAssistant:",
-                    "===", "[END]", 
-                    "\n\n\n"
-                ],
-                "stream": False
-            }
-            
-            response = requests.post(
+            async with self._session.post(
                 f"{self.server_url}/v1/completions",
-                json=payload,
-                timeout=30
-            )
+                data=_json_dumps(payload),
+                headers=JSON_HEADERS,
+                timeout=aiohttp.ClientTimeout(total=30)
+            ) as response:
+                response.raise_for_status()
+                # Clean as we go so the streamed answer equals generate_response's/the cached one
+                raw = ""
+                emitted = ""
+                async for line in response.content:
+                    line = line.strip()
+                    if not line.startswith(b"data: "):
+                        continue
+                    data = line[6:]
+                    if data == b"[DONE]":
+                        break
+                    choices = _json_loads(data).get("choices", [])
+                    text = choices[0].get("text", "") if choices else ""
+                    if text:
+                        raw += text
+                        if self._STOP_RE.search(raw):
+                            break  # everything after the marker is discarded anyway
+                        clean = self._streamable_prefix(raw)
+                        if len(clean) > len(emitted) and clean.startswith(emitted):
+                            yield clean[len(emitted):]
+                            emitted = clean
+            response_text = self._post_process_response(raw)
+            if len(response_text) > len(emitted) and response_text.startswith(emitted):
+                yield response_text[len(emitted):]
+            if response_text and query_embedding is not None and self.response_cache is not None:
+                self.response_cache.store(query_embedding, response_text)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error(f"Error streaming from LLM server: {e}")
+            if isinstance(e, aiohttp.ClientConnectionError) and not isinstance(e, asyncio.TimeoutError):
+                self._mark_server_unavailable(e)
+            raise
+        finally:
+            logger.info(f"Response streamed in {time.time() - start_time:.2f}s")
+
+    def _mark_server_unavailable(self, error: Exception):
+        """Fall back to RAG-only answers until the server passes a health check again."""
+        if self.is_initialized:
+            logger.warning(f"LLM server unavailable at {self.server_url} ({error}), using fallback mode")
+        self.is_initialized = False
+
+    def _exact_cache_key(self, prompt: str) -> str:
+        return hashlib.blake2b(
+            f"{prompt}\0{self.temperature}\0{self.max_tokens}".encode(),
+            digest_size=16
+        ).hexdigest()
+
+    async def _call_llm_server(self, prompt: str) -> Tuple[str, bool]:
+        """Return (response text, whether it came from the model rather than an error path)."""
+        # Identical full prompts (same question and context) at low temperature reuse the answer
+        cache_key = None
+        if self.temperature is not None and self.temperature <= EXACT_CACHE_MAX_TEMPERATURE:
+            cache_key = self._exact_cache_key(prompt)
+            cached = self._exact_cache.get(cache_key)
+            if cached is not None:
+                self._exact_cache.move_to_end(cache_key)
+                logger.debug("Exact-match cache hit")
+                return cached, True
+        response_text, generated = await self._submit_completion(prompt)
+        if cache_key is not None and generated:
+            self._exact_cache[cache_key] = response_text
+            if len(self._exact_cache) > EXACT_CACHE_MAX_ENTRIES:
+                self._exact_cache.popitem(last=False)
+        return response_text, generated
+
+    async def _submit_completion(self, prompt: str) -> Tuple[str, bool]:
+        if self.completion_batch_size <= 1:
+            return await self._request_completion(prompt)
+        if self._batch_worker_task is None or self._batch_worker_task.done():
+            self._completion_queue = asyncio.Queue()
+            self._batch_worker_task = asyncio.create_task(self._batch_worker())
+        future = asyncio.get_running_loop().create_future()
+        await self._completion_queue.put((prompt, future))
+        return await future
+
+    async def _batch_worker(self):
+        """Collect completions arriving within the batch window and fan them out together.
+
+        Only pays off against a llama.cpp ``llama-server`` started with
+        ``--parallel N --cont-batching``, which decodes concurrent slots in one batch.
+        """
+        while True:
+            batch = [await self._completion_queue.get()]
+            await asyncio.sleep(self.completion_batch_window)
+            while len(batch) < self.completion_batch_size and not self._completion_queue.empty():
+                batch.append(self._completion_queue.get_nowait())
+            logger.debug(f"Dispatching {len(batch)} completion(s) together")
+            task = asyncio.create_task(self._run_batch(batch))
+            self._inflight_batches.add(task)
+            task.add_done_callback(self._inflight_batches.discard)
+
+    async def _run_batch(self, batch: List[Tuple[str, asyncio.Future]]):
+        results = await asyncio.gather(
+            *(self._request_completion(prompt) for prompt, _ in batch),
+            return_exceptions=True
+        )
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    async def _request_completion(self, prompt: str) -> Tuple[str, bool]:
+        try:
+            payload = self._build_payload(prompt, stream=False)
             
-            if response.status_code == 200:
-                result = response.json()
-                choices = result.get("choices", [])
-                if choices:
-                    generated_text = choices[0].get("text", "").strip()
-                    generated_text = self._post_process_response(generated_text)
-                    return generated_text if generated_text else "I'm sorry, I couldn't generate a response."
+            async with self._session.post(
+                f"{self.server_url}/v1/completions",
+                data=_json_dumps(payload),
+                headers=JSON_HEADERS,
+                timeout=aiohttp.ClientTimeout(total=30)
+            ) as response:
+                if response.status == 200:
+                    result = _json_loads(await response.read())
+                    choices = result.get("choices", [])
+                    if choices:
+                        generated_text = choices[0].get("text", "").strip()
+                        generated_text = self._post_process_response(generated_text)
+                        if generated_text:
+                            return generated_text, True
+                    return "I'm sorry, I couldn't generate a response.", False
                 else:
-                    return "I'm sorry, I couldn't generate a response."
-            else:
-                logger.error(f"LLM server error: {response.status_code} - {response.text}")
-                return "I'm experiencing technical difficulties. Please try again."
+                    logger.error(f"LLM server error: {response.status} - {await response.text()}")
+                    return "I'm experiencing technical difficulties. Please try again.", False
                 
-        except requests.exceptions.Timeout:
+        except asyncio.TimeoutError:
             logger.error("LLM server timeout")
-            return "The request took too long. Please try a simpler question."
+            return "The request took too long. Please try a simpler question.", False
         except Exception as e:
             logger.error(f"Error calling LLM server: {e}")
             raise
     
+    # Cut at the first leaked turn/context marker
+    _STOP_RE = re.compile(r"User:|Assistant:|CONTEXT|===|\[Document")
+    _NEWLINES_RE = re.compile(r"\n{3,}")
+    # Preambles like "Based on the context: ..." are dropped up to the first colon
+    _PREAMBLE_PHRASES = (
+        "based on the context",
+        "according to the provided information",
+        "from the knowledge base",
+        "the context shows",
+    )
+    _PREAMBLE_RE = re.compile(
+        r"(?:" + "|".join(map(re.escape, _PREAMBLE_PHRASES)) + r")[^:]*:",
+        re.IGNORECASE
+    )
+    # A streamed tail this long may still grow into a stop marker ("Assistant:")
+    _STOP_HOLDBACK = len("Assistant:") - 1
+
     def _post_process_response(self, text: str) -> str:
-        for marker in ["User:", "Assistant:", "CONTEXT", "===", "[Document"]:
-            if marker in text:
-                text = text.split(marker)[0]
-        while "\n\n\n" in text:
-            text = text.replace("\n\n\n", "\n\n")
-        text = text.strip()
-        avoid_phrases = [
-            "based on the context",
-            "according to the provided information",
-            "from the knowledge base",
-            "the context shows"
-        ]
-        
-        text_lower = text.lower()
-        for phrase in avoid_phrases:
-            if text_lower.startswith(phrase):
-                parts = text.split(":", 1)
-                if len(parts) > 1:
-                    text = parts[1].strip()
-                    if text:
-                        text = text[0].upper() + text[1:]
+        text = self._STOP_RE.split(text, maxsplit=1)[0]
+        text = self._NEWLINES_RE.sub("\n\n", text).strip()
+        preamble = self._PREAMBLE_RE.match(text)
+        if preamble:
+            text = text[preamble.end():].strip()
+            if text:
+                text = text[0].upper() + text[1:]
         return text
 
+    def _streamable_prefix(self, raw: str) -> str:
+        """Post-processed text of a partial completion that later tokens can no longer change."""
+        head = raw[:max(0, len(raw) - self._STOP_HOLDBACK)]
+        lead = head.lstrip().lower()
+        if ":" not in lead and any(p.startswith(lead) or lead.startswith(p) for p in self._PREAMBLE_PHRASES):
+            return ""  # may still turn out to be a preamble
+        return self._post_process_response(head)
+
     def _generate_fallback_response(self, query: str, rag_results: Optional[List[Dict]] = None) -> str:
         if rag_results and len(rag_results) > 0:
             top_result = rag_results[0]
@@ -242,15 +518,106 @@ Do NOT start with "According to" or "Based on" - answer directly."""
             return "I apologize, but I'm unable to process your request at the moment. The LLM server is not available and I couldn't find relevant information in the knowledge base."
     
     async def check_server_health(self) -> bool:
+        if self._session is None or self._session.closed:
+            return False
         try:
-            response = requests.get(f"{self.server_url}/v1/models", timeout=2)
-            return response.status_code == 200
+            async with self._session.get(
+                f"{self.server_url}/v1/models",
+                timeout=aiohttp.ClientTimeout(total=2)
+            ) as response:
+                return response.status == 200
         except Exception:
             return False
 
     async def cleanup(self):
+        if self._batch_worker_task is not None:
+            self._batch_worker_task.cancel()
+            try:
+                await self._batch_worker_task
+            except asyncio.CancelledError:
+                pass
+            self._batch_worker_task = None
+        if self._inflight_batches:
+            await asyncio.gather(*self._inflight_batches, return_exceptions=True)
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
         if self.rag_component:
             await self.rag_component.cleanup()
         if self.reranker_component:
             await self.reranker_component.cleanup()
         logger.info("LLM component cleaned up")
+
+
+class BatchedLLMDispatcher:
+    """Coalesces prompts that arrive close together and dispatches them concurrently.
+
+    Requests submitted within ``max_wait_ms`` of each other (from several kiosk
+    sessions or speculative rephrasings) are drained as one batch and run in
+    parallel against the LLM, bounded by ``max_concurrent``.
+    """
+
+    def __init__(self, llm: LLMComponent, max_concurrent: int = 8, max_wait_ms: float = 30, use_rag: bool = True):
+        self.llm = llm
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.max_wait = max_wait_ms / 1000.0
+        self.use_rag = use_rag
+        self._queue: "asyncio.Queue[Tuple[str, Optional[List[Dict]], asyncio.Future]]" = asyncio.Queue()
+        self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        self._worker: Optional[asyncio.Task] = None
+        self._inflight: set = set()
+
+    async def submit(self, prompt: str, conversation_history: Optional[List[Dict]] = None) -> Optional[str]:
+        """Queue a prompt and wait for its response."""
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._drain_loop())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((prompt, conversation_history, future))
+        return await future
+
+    async def _drain_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_concurrent:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            logger.debug(f"Dispatching batch of {len(batch)} prompt(s)")
+            for item in batch:
+                task = asyncio.create_task(self._dispatch(*item))
+                self._inflight.add(task)
+                task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, prompt: str, conversation_history: Optional[List[Dict]], future: asyncio.Future):
+        async with self._semaphore:
+            try:
+                result = await self.llm.generate_response(
+                    prompt,
+                    use_rag=self.use_rag,
+                    conversation_history=conversation_history
+                )
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+                return
+            if not future.done():
+                future.set_result(result)
+
+    async def close(self):
+        """Stop the drain loop and wait for in-flight requests to finish."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
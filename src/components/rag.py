@@ -1,11 +1,34 @@
+import asyncio
 import logging
-from typing import Optional, List, Dict
-from sentence_transformers import SentenceTransformer
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Optional, List, Dict, Tuple
+from components.vector_index import FaissVectorIndex
 from repositories.knowledge_base_repository import KnowledgeBaseRepository
 from services.settings import get_settings
+from utils.torch_threads import configure_torch_threads
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
 
 logger = logging.getLogger(__name__)
 
+# Process-wide embedders keyed by (model, backend, onnx file) so every RAGComponent
+# (tests, reloads, several sessions) shares one copy of the weights
+_EMBEDDERS: Dict[Tuple[str, str, Optional[str]], "SentenceTransformer"] = {}
+_EMBEDDERS_LOCK = threading.Lock()
+
+
+def get_embedder(model_name: str, backend: str = 'torch', onnx_file: Optional[str] = None) -> "SentenceTransformer":
+    """Return the shared embedder for this configuration, loading it on first use."""
+    key = (model_name, backend, onnx_file)
+    with _EMBEDDERS_LOCK:
+        model = _EMBEDDERS.get(key)
+        if model is None:
+            model = RAGComponent._load_embedding_model(model_name, backend, onnx_file)
+            _EMBEDDERS[key] = model
+        return model
+
 
 class RAGComponent:
     def __init__(self, config):
@@ -14,6 +37,11 @@ class RAGComponent:
         self.embedding_model = None
         self.settings = None
         self.is_initialized = False
+        # normalized query text -> embedding, LRU first
+        self._embedding_cache: "OrderedDict[str, object]" = OrderedDict()
+        self.embedding_cache_size = config.get('rag', {}).get('query_embedding_cache_size', 2048) if config else 2048
+        self._pending_embeddings: Dict[str, "asyncio.Task"] = {}  # in-flight encodes, keyed like the cache
+        self.vector_index: Optional[FaissVectorIndex] = None
         
     async def initialize(self):
         try:
@@ -22,16 +50,23 @@ class RAGComponent:
             self.repository = KnowledgeBaseRepository()
             await self.repository.initialize()
             logger.info("Knowledge base repository initialized")
-            model_name = self.config.get('models', {}).get('embedding_model', self.settings.EMBEDDING_MODEL)
-            logger.info(f"Loading embedding model: {model_name}")
-            self.embedding_model = SentenceTransformer(model_name)
+            models_config = self.config.get('models', {})
+            model_name = models_config.get('embedding_model', self.settings.EMBEDDING_MODEL)
+            backend = models_config.get('embedding_backend', 'torch')
+            onnx_file = models_config.get('embedding_onnx_file')
+            logger.info(f"Loading embedding model: {model_name} ({backend})")
+            configure_torch_threads(self.config.get('performance', {}).get('embedding_threads'))
+            # load off the event loop so other components can initialize concurrently
+            self.embedding_model = await asyncio.to_thread(get_embedder, model_name, backend, onnx_file)
             has_docs = await self.repository._has_documents()
             if not has_docs:
                 logger.warning("Knowledge base is empty. Run the scraper to ingest data.")
             else:
                 stats = await self.repository.get_knowledge_base_stats()
                 logger.info(f"Knowledge base: {stats.total_documents} documents from {stats.unique_sources} sources")
+                await self._init_vector_index(stats.total_documents)
             
+            await self._warmup()
             self.is_initialized = True
             logger.info("RAG component initialized successfully")
             
@@ -40,18 +75,124 @@ class RAGComponent:
             raise
     
     
-    async def search(self, query: str, limit: int = 5, category: Optional[str] = None, language: Optional[str] = None, similarity_threshold: float = 0.3) -> List[Dict]:
+    async def _warmup(self):
+        """Run a throwaway encode so the first real query doesn't pay the cold-start cost."""
+        try:
+            await asyncio.to_thread(self.embedding_model.encode, "warmup query", normalize_embeddings=True)
+        except Exception as e:
+            logger.warning(f"Embedding model warm-up failed: {e}")
+
+    async def _init_vector_index(self, document_count: int):
+        """Load (or build from pgvector) the in-process FAISS index if enabled."""
+        rag_config = self.config.get('rag', {})
+        if not rag_config.get('use_faiss', False):
+            return
+        if not FaissVectorIndex.is_available():
+            logger.warning("rag.use_faiss is set but faiss is not installed; using pgvector search")
+            return
+        index = FaissVectorIndex(
+            index_path=rag_config.get('faiss_index_path', 'data/faiss.index'),
+            nlist=rag_config.get('faiss_nlist', 256),
+            pq_m=rag_config.get('faiss_pq_m', 48),
+            nprobe=rag_config.get('faiss_nprobe', 16)
+        )
+        if not await asyncio.to_thread(index.load, document_count):
+            rows = await self.repository.get_all_embeddings()
+            if not rows:
+                return
+            await asyncio.to_thread(index.build, rows)
+        self.vector_index = index
+
+    @staticmethod
+    def _to_result(doc_id, content: str, metadata: Dict, similarity: float, rank: int, embedding: Optional[List[float]] = None) -> Dict:
+        result = {
+            'id': str(doc_id),
+            'title': metadata.get('title', 'Untitled'),
+            'content': content,
+            'similarity': similarity,
+            'rank': rank,
+            'category': metadata.get('category', 'general'),
+            'source': metadata.get('source', 'unknown'),
+            'framework': metadata.get('framework', 'Campus'),
+            'tags': metadata.get('tags', [])
+        }
+        if embedding:
+            result['embedding'] = embedding  # lets the reranker collapse near-duplicates
+        return result
+
+    @staticmethod
+    def _load_embedding_model(model_name: str, backend: str = 'torch', onnx_file: Optional[str] = None) -> "SentenceTransformer":
+        """Load the embedding model, preferring ONNX Runtime (e.g. an int8 VNNI export) when configured."""
+        # Imported here so importing this module doesn't pull in torch/transformers
+        from sentence_transformers import SentenceTransformer
+
+        if backend == 'onnx':
+            try:
+                model_kwargs = {"file_name": onnx_file} if onnx_file else None
+                return SentenceTransformer(model_name, backend="onnx", model_kwargs=model_kwargs)
+            except Exception as e:
+                logger.warning(f"ONNX embedding backend unavailable ({e}), falling back to PyTorch")
+        return SentenceTransformer(model_name)
+
+    async def embed_query(self, query: str):
+        """Embed a query with the knowledge-base embedding model, off the event loop.
+
+        Embeddings are cached per normalized query (lowercased, whitespace collapsed),
+        and concurrent requests for the same uncached query share one encode.
+        """
+        key = " ".join(query.lower().split())
+        embedding = self._embedding_cache.get(key)
+        if embedding is not None:
+            self._embedding_cache.move_to_end(key)
+            return embedding
+        task = self._pending_embeddings.get(key)
+        if task is None:
+            task = asyncio.create_task(self._encode_query(key))
+            self._pending_embeddings[key] = task
+        # shield: a cancelled caller must not cancel the encode other callers await
+        return await asyncio.shield(task)
+
+    async def _encode_query(self, key: str):
+        try:
+            embedding = await asyncio.to_thread(self.embedding_model.encode, key, normalize_embeddings=True)
+            embedding.setflags(write=False)  # shared between callers
+            if self.embedding_cache_size > 0:
+                self._embedding_cache[key] = embedding
+                if len(self._embedding_cache) > self.embedding_cache_size:
+                    self._embedding_cache.popitem(last=False)
+            return embedding
+        finally:
+            self._pending_embeddings.pop(key, None)
+
+    async def search(self, query: str, limit: int = 5, category: Optional[str] = None, language: Optional[str] = None, similarity_threshold: float = 0.3, query_embedding=None) -> List[Dict]:
         if not self.is_initialized:
             logger.warning("RAG not initialized")
             return []
         try:
             logger.info(f"Searching for: {query}")
-            query_embedding = self.embedding_model.encode(query).tolist()
+            # Callers that already embedded the query (e.g. for the response cache) pass it in
+            if query_embedding is None:
+                query_embedding = await self.embed_query(query)
             filter_metadata = {}
             if category:
                 filter_metadata['category'] = category
             if language:
                 filter_metadata['language'] = language
+
+            if self.vector_index is not None:
+                hits = self.vector_index.search(
+                    query_embedding,
+                    k=limit,
+                    filter_metadata=filter_metadata or None,
+                    similarity_threshold=similarity_threshold
+                )
+                logger.info(f"Found {len(hits)} relevant documents (FAISS)")
+                return [
+                    self._to_result(hit['document']['id'], hit['document']['content'], hit['document']['metadata'], hit['similarity'], rank)
+                    for rank, hit in enumerate(hits, 1)
+                ]
+
+            # The float32 ndarray goes straight to the pgvector binary codec
             results = await self.repository.search_similar_documents(
                 query_embedding=query_embedding,
                 k=limit,
@@ -60,21 +201,10 @@ class RAGComponent:
             )
             
             logger.info(f"Found {len(results)} relevant documents")
-            documents = []
-            for result in results:
-                documents.append({
-                    'id': str(result.document.id),
-                    'title': result.document.metadata.get('title', 'Untitled'),
-                    'content': result.document.content,
-                    'similarity': result.similarity_score,
-                    'rank': result.rank,
-                    'category': result.document.metadata.get('category', 'general'),
-                    'source': result.document.metadata.get('source', 'unknown'),
-                    'framework': result.document.metadata.get('framework', 'Campus'),
-                    'tags': result.document.metadata.get('tags', [])
-                })
-            
-            return documents
+            return [
+                self._to_result(result.document.id, result.document.content, result.document.metadata, result.similarity_score, result.rank, result.document.embedding)
+                for result in results
+            ]
             
         except Exception as e:
             logger.error(f"Error in RAG search: {e}")
@@ -119,4 +249,5 @@ class RAGComponent:
         if self.repository:
             await self.repository.close()
         self.embedding_model = None
+        self._embedding_cache.clear()
         logger.info("RAG component cleaned up")
@@ -5,11 +5,53 @@ Uses cross-encoder models to rerank retrieved documents based on query relevance
 Supports both local models (BGE reranker) and API-based rerankers.
 """
 
+import asyncio
+import concurrent.futures
+import contextlib
+import hashlib
+import heapq
 import logging
-from typing import List, Dict, Optional
+import re
+import threading
+import time
+from collections import OrderedDict
+from itertools import repeat
+from typing import List, Dict, Optional, Tuple
+
+import numpy as np
+
+from utils.torch_threads import configure_torch_threads
 
 logger = logging.getLogger(__name__)
 
+_WORD_RE = re.compile(r"\w+")
+# Quoted phrase or a single ASCII token (identifier, number): retrieval order already fits
+_LITERAL_QUERY_RE = re.compile(r'\s*(?:"[^"]+"|[\x21-\x7e]+)\s*')
+
+
+class _DisjointSet:
+    """Union-find over candidate indices (path halving, union by size)."""
+
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+        self.size = [1] * n
+
+    def find(self, x: int) -> int:
+        parent = self.parent
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(self, a: int, b: int):
+        ra, rb = self.find(a), self.find(b)
+        if ra == rb:
+            return
+        if self.size[ra] < self.size[rb]:
+            ra, rb = rb, ra
+        self.parent[rb] = ra
+        self.size[ra] += self.size[rb]
+
 
 class RerankerComponent:
     """Reranks retrieved documents using cross-encoder models for better relevance."""
@@ -26,7 +68,29 @@ class RerankerComponent:
         self.is_initialized = False
         self.use_reranker = self.config.get('use_reranker', True)
         self.model_name = self.config.get('reranker_model', 'BAAI/bge-reranker-base')
+        self.backend = self.config.get('reranker_backend', 'torch')  # torch or onnx
+        self.onnx_file = self.config.get('reranker_onnx_file')
+        self.quantize = self.config.get('reranker_quantize', False)  # int8 dynamic quantization (torch backend)
         self.top_k = self.config.get('final_top_k', 5)
+        # Pairs per forward pass; the default 20 candidates still fit in one batch
+        self.max_batch_size = self.config.get('rerank_batch_size', 32)
+        # (query hash, doc hash) -> (score, stored at); FAQ traffic repeats the same pairs
+        self._score_cache: "OrderedDict[Tuple[bytes, bytes], Tuple[float, float]]" = OrderedDict()
+        self._cache_max = self.config.get('rerank_cache_size', 8192)
+        self._cache_ttl = self.config.get('rerank_cache_ttl_seconds', 900)
+        self._cache_lock = threading.Lock()  # _score runs on executor threads
+        # Scoring runs here so rerank() never blocks the event loop and concurrent
+        # requests (several kiosk users) don't serialize behind one another
+        self.rerank_workers = self.config.get('rerank_workers', 2)
+        self._executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        # Keep prune_multiplier * top_k candidates after the cheap lexical prune (0 disables)
+        self.prune_multiplier = self.config.get('prune_multiplier', 2)
+        # Candidates whose embeddings are at least this similar are scored once (0 disables)
+        self.dedup_threshold = self.config.get('dedup_threshold', 0.95)
+        self.skip_rerank_literal = self.config.get('skip_rerank_literal', True)
+        self._inference_mode = contextlib.nullcontext  # torch.inference_mode once torch is loaded
+        self.bf16 = self.config.get('reranker_bf16', False)  # bf16 autocast on AVX512-BF16/AMX CPUs
+        self._autocast = None
         
     async def initialize(self):
         """Initialize the reranker model."""
@@ -37,12 +101,14 @@ class RerankerComponent:
             
         try:
             logger.info(f"Initializing reranker with model: {self.model_name}")
+            # Before the model is constructed; shared with the embedder (first caller wins)
+            configure_torch_threads(self.config.get('torch_threads'))
             
-            # Import here to avoid dependency issues if not used
-            from sentence_transformers import CrossEncoder
-            
-            # Load the cross-encoder model
-            self.model = CrossEncoder(self.model_name, max_length=512)
+            # Load the cross-encoder model off the event loop
+            self.model = await asyncio.to_thread(self._load_model)
+            self._executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=max(1, int(self.rerank_workers)), thread_name_prefix="reranker"
+            )
             
             self.is_initialized = True
             logger.info(f"Reranker initialized successfully with {self.model_name}")
@@ -59,6 +125,215 @@ class RerankerComponent:
             self.use_reranker = False
             self.is_initialized = False
     
+    def _load_model(self):
+        """Load the cross-encoder, preferring ONNX Runtime when configured."""
+        # Import here to avoid dependency issues if not used
+        import torch
+        from sentence_transformers import CrossEncoder
+
+        # Cheaper than no_grad: no version-counter / view tracking on the forward pass
+        self._inference_mode = torch.inference_mode
+
+        if self.backend == 'onnx':
+            try:
+                # Exported with graph optimizations on first load if the repo has no ONNX file
+                model_kwargs = {"file_name": self.onnx_file} if self.onnx_file else None
+                return CrossEncoder(self.model_name, max_length=512, backend="onnx", model_kwargs=model_kwargs)
+            except Exception as e:
+                logger.warning(f"ONNX reranker backend unavailable ({e}), falling back to PyTorch")
+        model = CrossEncoder(self.model_name, max_length=512)
+        if self.quantize:
+            model.model = self._quantize_dynamic(model.model)
+        elif self.bf16:
+            self._enable_bf16(model)
+        return model
+
+    def _enable_bf16(self, model):
+        """Run the forward pass under bf16 autocast when the CPU has native bf16 FMA."""
+        import torch
+
+        if not self._cpu_supports_bf16():
+            logger.info("CPU lacks AVX512-BF16/AMX; keeping the reranker in fp32")
+            return
+        try:
+            import intel_extension_for_pytorch as ipex
+            model.model = ipex.optimize(model.model.eval(), dtype=torch.bfloat16)
+        except ImportError:
+            logger.debug("intel_extension_for_pytorch not installed; using plain autocast")
+        self._autocast = lambda: torch.autocast("cpu", dtype=torch.bfloat16)
+        logger.info("Reranker running with bf16 autocast")
+
+    @staticmethod
+    def _cpu_supports_bf16() -> bool:
+        try:
+            with open("/proc/cpuinfo") as f:
+                flags = f.read()
+        except OSError:
+            return False
+        return "avx512_bf16" in flags or "amx_bf16" in flags
+
+    def _inference_context(self) -> contextlib.ExitStack:
+        stack = contextlib.ExitStack()
+        stack.enter_context(self._inference_mode())
+        if self._autocast is not None:
+            stack.enter_context(self._autocast())
+        return stack
+
+    @staticmethod
+    def _quantize_dynamic(module):
+        """Swap Linear layers for int8 dynamically quantized ones (VNNI on x86, NEON dot on ARM)."""
+        import torch
+
+        supported = torch.backends.quantized.supported_engines
+        for engine in ("onednn", "fbgemm", "qnnpack"):
+            if engine in supported:
+                torch.backends.quantized.engine = engine
+                break
+        logger.info(f"Quantizing reranker Linear layers to int8 (engine: {torch.backends.quantized.engine})")
+        return torch.quantization.quantize_dynamic(module, {torch.nn.Linear}, dtype=torch.qint8)
+
+    def _collapse_duplicates(self, documents: List[Dict]) -> List[Dict]:
+        """Keep one representative (highest similarity) per cluster of near-duplicate candidates.
+
+        Needs the retriever's embeddings on every candidate; otherwise returns the input.
+        """
+        if self.dedup_threshold <= 0 or len(documents) < 2 or any(not doc.get('embedding') for doc in documents):
+            return documents
+        emb = np.asarray([doc['embedding'] for doc in documents], dtype=np.float32)
+        emb /= np.maximum(np.linalg.norm(emb, axis=1, keepdims=True), 1e-12)
+        rows, cols = np.nonzero(np.triu(emb @ emb.T, k=1) >= self.dedup_threshold)
+        if rows.size == 0:
+            return documents
+
+        dsu = _DisjointSet(len(documents))
+        for a, b in zip(rows.tolist(), cols.tolist()):
+            dsu.union(a, b)
+        best: Dict[int, int] = {}
+        for i, doc in enumerate(documents):
+            root = dsu.find(i)
+            if root not in best or doc.get('similarity', 0.0) > documents[best[root]].get('similarity', 0.0):
+                best[root] = i
+        kept = [documents[i] for i in sorted(best.values())]
+        logger.debug(f"Collapsed {len(documents) - len(kept)} near-duplicate candidates")
+        return kept
+
+    def _prune(self, query: str, documents: List[Dict], k: int) -> List[Dict]:
+        """Cheap first stage: keep the candidates with the best query-token overlap + similarity."""
+        keep = max(k, int(self.prune_multiplier * k))
+        if self.prune_multiplier <= 0 or len(documents) <= keep:
+            return documents
+        query_tokens = set(_WORD_RE.findall(query.lower()))
+        denom = max(len(query_tokens), 1)
+
+        def prune_score(doc: Dict) -> float:
+            overlap = len(query_tokens.intersection(_WORD_RE.findall(doc.get('content', '').lower()))) / denom
+            return 0.5 * overlap + 0.5 * doc.get('similarity', 0.0)
+
+        kept = heapq.nlargest(keep, documents, key=prune_score)
+        logger.debug(f"Lexical prune kept {len(kept)} of {len(documents)} candidates")
+        return kept
+
+    @staticmethod
+    def _top_k(documents: List[Dict], scores, k: int) -> List[Dict]:
+        """Set 'rerank_score' on each document and return the k best, highest first."""
+        scores = np.asarray(scores, dtype=np.float32)
+        for doc, score in zip(documents, scores.tolist()):
+            doc['rerank_score'] = score
+        if k < len(scores):
+            idx = np.argpartition(-scores, k)[:k]
+            idx = idx[np.argsort(-scores[idx], kind='stable')]
+        else:
+            idx = np.argsort(-scores, kind='stable')
+        return [documents[i] for i in idx.tolist()]
+
+    @staticmethod
+    def _digest(text: str) -> bytes:
+        return hashlib.blake2b(text.encode(), digest_size=16).digest()
+
+    @staticmethod
+    def _keep_retrieval_order(documents: List[Dict], k: int) -> List[Dict]:
+        """Return the first k documents, scored by their retrieval similarity."""
+        kept = documents[:k]
+        for doc in kept:
+            doc['rerank_score'] = doc.get('similarity', 0.0)
+        return kept
+
+    def _is_literal_query(self, query: str) -> bool:
+        return self.skip_rerank_literal and _LITERAL_QUERY_RE.fullmatch(query) is not None
+
+    @staticmethod
+    def _contents(documents: List[Dict]) -> List[str]:
+        return [doc['content'] if 'content' in doc else '' for doc in documents]
+
+    def _score(self, query: str, contents: List[str]) -> np.ndarray:
+        """Score (query, content) pairs, running the model only for pairs not cached."""
+        if self._cache_max <= 0:
+            return self._predict_scores(query, contents)
+
+        now = time.monotonic()
+        query_hash = self._digest(query)
+        keys = [(query_hash, self._digest(content)) for content in contents]
+        scores = np.empty(len(contents), dtype=np.float32)
+        misses = []
+        with self._cache_lock:
+            for i, key in enumerate(keys):
+                entry = self._score_cache.get(key)
+                if entry is not None and now - entry[1] <= self._cache_ttl:
+                    self._score_cache.move_to_end(key)
+                    scores[i] = entry[0]
+                else:
+                    misses.append(i)
+
+        if misses:
+            # Predict outside the lock so concurrent requests overlap
+            miss_scores = self._predict_scores(query, [contents[i] for i in misses])
+            with self._cache_lock:
+                for i, score in zip(misses, miss_scores.tolist()):
+                    scores[i] = score
+                    self._score_cache[keys[i]] = (score, now)
+                    self._score_cache.move_to_end(keys[i])
+                while len(self._score_cache) > self._cache_max:
+                    self._score_cache.popitem(last=False)
+        logger.debug(f"Rerank score cache: {len(contents) - len(misses)}/{len(contents)} hits")
+        return scores
+
+    def _predict_scores(self, query: str, contents: List[str]) -> np.ndarray:
+        """Score all (query, content) pairs, batching documents of similar length together.
+
+        Padding is driven by the longest pair in a batch, so when the candidates
+        span several batches, length-sorting keeps short documents out of long
+        batches. Scores are returned in the original document order.
+        """
+        batch_size = min(len(contents), self.max_batch_size)
+        if len(contents) <= batch_size:
+            order = None
+            sorted_contents = contents
+        else:
+            lengths = self._token_lengths(contents)
+            order = np.argsort(lengths, kind='stable')
+            sorted_contents = [contents[i] for i in order]
+
+        with self._inference_context():
+            raw = self.model.predict(
+                list(zip(repeat(query), sorted_contents)),
+                batch_size=batch_size,
+                show_progress_bar=False,
+                convert_to_numpy=True
+            )
+        raw = np.asarray(raw, dtype=np.float32)
+        if order is None:
+            return raw
+        scores = np.empty_like(raw)
+        scores[order] = raw
+        return scores
+
+    def _token_lengths(self, contents: List[str]) -> np.ndarray:
+        tokenizer = getattr(self.model, 'tokenizer', None)
+        if tokenizer is None:
+            return np.fromiter((len(c) for c in contents), dtype=np.int64, count=len(contents))
+        encoded = tokenizer(contents, add_special_tokens=False, truncation=True, max_length=512)['input_ids']
+        return np.fromiter((len(ids) for ids in encoded), dtype=np.int64, count=len(encoded))
+
     async def rerank(
         self, 
         query: str, 
@@ -80,31 +355,23 @@ class RerankerComponent:
             logger.debug("Reranker not available, returning documents as-is")
             return documents[:top_k or self.top_k]
         
+        if self._is_literal_query(query):
+            logger.debug("Literal lookup query, keeping retrieval order")
+            return self._keep_retrieval_order(documents, top_k or self.top_k)
+        
         if not documents:
             return []
         
         try:
             k = top_k or self.top_k
+            candidates = self._prune(query, self._collapse_duplicates(documents), k)
             
-            # Prepare query-document pairs for cross-encoder
-            pairs = [[query, doc.get('content', '')] for doc in documents]
+            # Get relevance scores from cross-encoder (blocking, so on the executor)
+            loop = asyncio.get_running_loop()
+            scores = await loop.run_in_executor(self._executor, self._score, query, self._contents(candidates))
             
-            # Get relevance scores from cross-encoder
-            scores = self.model.predict(pairs)
-            
-            # Add rerank scores to documents
-            for doc, score in zip(documents, scores):
-                doc['rerank_score'] = float(score)
-            
-            # Sort by rerank score (descending)
-            reranked_docs = sorted(
-                documents, 
-                key=lambda x: x.get('rerank_score', -float('inf')), 
-                reverse=True
-            )
-            
-            # Return top-k results
-            top_results = reranked_docs[:k]
+            # Attach scores and select the top-k results
+            top_results = self._top_k(candidates, scores, k)
             
             if top_results:
                 logger.info(
@@ -139,29 +406,21 @@ class RerankerComponent:
         if not self.use_reranker or not self.is_initialized:
             return documents[:top_k or self.top_k]
         
+        if self._is_literal_query(query):
+            return self._keep_retrieval_order(documents, top_k or self.top_k)
+        
         if not documents:
             return []
         
         try:
             k = top_k or self.top_k
-            
-            # Prepare query-document pairs
-            pairs = [[query, doc.get('content', '')] for doc in documents]
+            candidates = self._prune(query, self._collapse_duplicates(documents), k)
             
             # Get scores
-            scores = self.model.predict(pairs)
-            
-            # Add scores and sort
-            for doc, score in zip(documents, scores):
-                doc['rerank_score'] = float(score)
-            
-            reranked_docs = sorted(
-                documents, 
-                key=lambda x: x.get('rerank_score', -float('inf')), 
-                reverse=True
-            )
+            scores = self._score(query, self._contents(candidates))
             
-            return reranked_docs[:k]
+            # Add scores and select top-k
+            return self._top_k(candidates, scores, k)
             
         except Exception as e:
             logger.error(f"Error during reranking: {e}")
@@ -169,9 +428,13 @@ class RerankerComponent:
     
     async def cleanup(self):
         """Clean up resources."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
         if self.model is not None:
             del self.model
             self.model = None
+        self._score_cache.clear()
         self.is_initialized = False
         logger.info("Reranker component cleaned up")
 
@@ -0,0 +1,91 @@
+"""
+Semantic response cache.
+
+Keeps (query embedding, response) pairs in a preallocated float32 matrix so a
+lookup against every cached query is a single matrix-vector product. Entries
+are evicted least-recently-used once the cache is full, and optionally expire
+after a fixed time-to-live.
+"""
+
+import logging
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticCache:
+    """In-memory cache of responses keyed by query embedding similarity."""
+
+    def __init__(self, threshold: float = 0.85, max_entries: int = 1024, ttl_seconds: Optional[float] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            threshold: Minimum cosine similarity for a lookup to count as a hit
+            max_entries: Maximum number of cached responses (LRU eviction)
+            ttl_seconds: Age after which an entry no longer counts as a hit (None = never)
+        """
+        self.threshold = threshold
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = ttl_seconds
+        self._matrix: Optional[np.ndarray] = None  # (max_entries, dim), rows L2-normalized
+        self._stored_at = np.zeros(self.max_entries, dtype=np.float64)  # monotonic insert time per slot
+        self._size = 0
+        self._responses: "OrderedDict[int, str]" = OrderedDict()  # slot -> response, LRU first
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vec = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm > 0 else vec
+
+    def lookup(self, embedding) -> Optional[str]:
+        """Return the cached response for the most similar query, if above threshold."""
+        if self._size == 0:
+            self.misses += 1
+            return None
+
+        query = self._normalize(embedding)
+        scores = self._matrix[:self._size] @ query
+        if self.ttl_seconds is not None:
+            expired = self._stored_at[:self._size] < time.monotonic() - self.ttl_seconds
+            scores[expired] = -np.inf
+        slot = int(np.argmax(scores))
+        if scores[slot] < self.threshold:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._responses.move_to_end(slot)
+        logger.debug(f"Semantic cache hit (similarity: {scores[slot]:.3f})")
+        return self._responses[slot]
+
+    def store(self, embedding, response: str):
+        """Insert a (query embedding, response) pair, evicting the LRU entry if full."""
+        vec = self._normalize(embedding)
+        if self._matrix is None:
+            self._matrix = np.zeros((self.max_entries, vec.shape[0]), dtype=np.float32)
+
+        if self._size < self.max_entries:
+            slot = self._size
+            self._size += 1
+        else:
+            slot, _ = self._responses.popitem(last=False)
+
+        self._matrix[slot] = vec
+        self._stored_at[slot] = time.monotonic()
+        self._responses[slot] = response
+
+    def clear(self):
+        """Drop all cached entries."""
+        self._size = 0
+        self._responses.clear()
+
+    def __len__(self) -> int:
+        return self._size
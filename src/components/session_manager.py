@@ -5,8 +5,11 @@ Handles user sessions, conversation context, and interaction flow.
 
 import asyncio
 import logging
+import re
+import time
 import uuid
-from datetime import datetime, timedelta
+from collections import deque
+from datetime import datetime
 from typing import Optional, List, Dict
 import json
 
@@ -16,13 +19,23 @@ logger = logging.getLogger(__name__)
 class SessionManager:
     """Session manager for handling user interactions and context."""
     
+    # Mock intent routing: one regex pass instead of a lowercase + substring scan per keyword
+    _INTENT_RE = re.compile(r'\b(?:(?P<greet>hello|hi|hey)\b|(?P<help>help|assist)|(?P<thanks>thank))', re.IGNORECASE)
+    _INTENT_RESPONSES = {
+        "greet": "Hello! I'm your AI assistant. How can I help you today?",
+        "help": "I can help you with information about services, products, or general questions. What would you like to know?",
+        "thanks": "You're welcome! Is there anything else I can help you with?",
+    }
+    
     def __init__(self, config):
         self.config = config
         self.current_session_id = None
-        self.session_start_time = None
-        self.conversation_history = []
+        self.session_start_time = None  # wall clock, for logs
+        self._session_start_mono = 0.0  # monotonic, for timeout accounting
         self.session_timeout = config.get('session', {}).get('timeout_seconds', 300)  # 5 minutes
         self.max_history = config.get('session', {}).get('max_history', 10)
+        # deque drops the oldest interaction in O(1) once max_history is reached
+        self.conversation_history: deque = deque(maxlen=self.max_history)
         self.is_initialized = False
         
     async def initialize(self):
@@ -41,7 +54,8 @@ class SessionManager:
         try:
             self.current_session_id = str(uuid.uuid4())
             self.session_start_time = datetime.now()
-            self.conversation_history = []
+            self._session_start_mono = time.monotonic()
+            self.conversation_history = deque(maxlen=self.max_history)
             
             logger.info(f"Started new session: {self.current_session_id}")
             return self.current_session_id
@@ -53,30 +67,34 @@ class SessionManager:
     async def end_session(self):
         """End the current session."""
         if self.current_session_id:
-            session_duration = datetime.now() - self.session_start_time
-            logger.info(f"Ended session {self.current_session_id} (duration: {session_duration})")
+            session_duration = time.monotonic() - self._session_start_mono
+            logger.info(f"Ended session {self.current_session_id} (duration: {session_duration:.1f}s)")
             
             self.current_session_id = None
             self.session_start_time = None
-            self.conversation_history = []
+            self.conversation_history = deque(maxlen=self.max_history)
     
     async def is_session_active(self) -> bool:
         """Check if current session is still active."""
         if not self.current_session_id or not self.session_start_time:
             return False
         
-        # Check if session has timed out
-        if datetime.now() - self.session_start_time > timedelta(seconds=self.session_timeout):
+        # Check if session has timed out (monotonic: immune to NTP/wall-clock jumps)
+        if time.monotonic() - self._session_start_mono > self.session_timeout:
             logger.info("Session timed out")
             await self.end_session()
             return False
         
         return True
     
+    async def _ensure_session(self):
+        """Start a new session if none is active (or the current one timed out)."""
+        if not await self.is_session_active():
+            await self.start_session()
+    
     async def add_to_history(self, user_input: str, response: str):
         """Add interaction to conversation history."""
-        if not self.is_session_active():
-            await self.start_session()
+        await self._ensure_session()
         
         interaction = {
             "timestamp": datetime.now().isoformat(),
@@ -86,15 +104,11 @@ class SessionManager:
         
         self.conversation_history.append(interaction)
         
-        # Keep only recent history
-        if len(self.conversation_history) > self.max_history:
-            self.conversation_history = self.conversation_history[-self.max_history:]
-        
         logger.debug(f"Added to history: {user_input[:50]}...")
     
     async def get_context(self) -> List[Dict]:
         """Get conversation context for LLM."""
-        return self.conversation_history.copy()
+        return list(self.conversation_history)
     
     async def process_interaction(self, user_input: str) -> str:
         """
@@ -108,8 +122,7 @@ class SessionManager:
         """
         try:
             # Ensure session is active
-            if not await self.is_session_active():
-                await self.start_session()
+            await self._ensure_session()
             
             logger.info(f"Processing interaction: {user_input[:50]}...")
             
@@ -134,15 +147,12 @@ class SessionManager:
             # Mock response generation for development
             # In production, this would integrate with LLM and RAG components
             
-            # Simple response based on input
-            if "hello" in user_input.lower() or "hi" in user_input.lower():
-                return "Hello! I'm your AI assistant. How can I help you today?"
-            elif "help" in user_input.lower():
-                return "I can help you with information about services, products, or general questions. What would you like to know?"
-            elif "thank" in user_input.lower():
-                return "You're welcome! Is there anything else I can help you with?"
-            else:
-                return "I understand your question. Let me provide you with some information about that topic."
+            # Simple response based on the first intent keyword in the input
+            match = self._INTENT_RE.search(user_input)
+            intent = match.lastgroup if match else None
+            return self._INTENT_RESPONSES.get(
+                intent, "I understand your question. Let me provide you with some information about that topic."
+            )
             
             # TODO: Integrate with actual LLM and RAG components
             # 1. Search knowledge base using RAG
@@ -4,6 +4,8 @@ Simplified implementation for initial development.
 """
 
 import asyncio
+import hashlib
+import io
 import logging
 import tempfile
 from pathlib import Path
@@ -13,6 +15,10 @@ import os
 
 logger = logging.getLogger(__name__)
 
+# Mock audio: 2 seconds of 16-bit mono silence
+MOCK_SAMPLE_RATE = 22050
+MOCK_DURATION_SECONDS = 2.0
+
 
 class TTSComponent:
     """TTS component using Piper for text-to-speech conversion."""
@@ -21,6 +27,8 @@ class TTSComponent:
         self.config = config
         self.piper_path = None
         self.voice_model = None
+        self._cache_dir = None
+        self._silence_wav_bytes: Optional[bytes] = None
         self.is_initialized = False
         
     async def initialize(self):
@@ -31,11 +39,16 @@ class TTSComponent:
             # For development, we'll use a mock implementation
             # In production, this would use actual Piper TTS
             self.voice_model = self.config.get('models', {}).get('tts_voice', 'en_US-ljspeech-medium')
+            self._cache_dir = self.config.get('models', {}).get('tts_cache_dir', 'data/tts_cache')
+            os.makedirs(self._cache_dir, exist_ok=True)
             
             # TODO: Download and setup Piper TTS
             # self.piper_path = Path("data/models/piper")
             # await self._download_piper_models()
             
+            # Mock output is constant, so encode the WAV once and reuse the bytes
+            self._silence_wav_bytes = self._build_silence_wav()
+            
             self.is_initialized = True
             logger.info("TTS component initialized successfully (mock mode)")
             
@@ -61,28 +74,17 @@ class TTSComponent:
         try:
             logger.debug(f"Synthesizing speech for: {text[:50]}...")
             
-            # Mock implementation for development
+            # Content-addressed output: identical text + voice reuses the earlier file
             if output_path is None:
-                output_path = f"temp_audio_{hash(text)}.wav"
-            
-            # Create a mock audio file (silence)
-            import wave
-            import numpy as np
-            
-            # Generate 2 seconds of silence as mock audio
-            sample_rate = 22050
-            duration = 2.0
-            samples = int(sample_rate * duration)
+                key = hashlib.blake2b(text.encode('utf-8'), digest_size=8).hexdigest()
+                output_path = os.path.join(self._cache_dir, f"tts_{self.voice_model}_{key}.wav")
+                if os.path.exists(output_path):
+                    logger.debug(f"Reusing cached audio file: {output_path}")
+                    return output_path
             
-            # Create silence
-            audio_data = np.zeros(samples, dtype=np.int16)
-            
-            # Save as WAV file
-            with wave.open(output_path, 'w') as wav_file:
-                wav_file.setnchannels(1)  # Mono
-                wav_file.setsampwidth(2)  # 16-bit
-                wav_file.setframerate(sample_rate)
-                wav_file.writeframes(audio_data.tobytes())
+            # Mock implementation for development
+            # Write the precomputed silent WAV as mock audio (off the event loop)
+            await asyncio.to_thread(self._write_wav, output_path, self._silence_wav_bytes)
             
             logger.debug(f"Generated mock audio file: {output_path}")
             return output_path
@@ -96,23 +98,43 @@ class TTSComponent:
             #         "--output_file", output_path
             #     ]
             #     
-            #     process = subprocess.run(
-            #         cmd,
-            #         input=text,
-            #         text=True,
-            #         capture_output=True
+            #     process = await asyncio.create_subprocess_exec(
+            #         *cmd,
+            #         stdin=asyncio.subprocess.PIPE,
+            #         stderr=asyncio.subprocess.PIPE
             #     )
+            #     _, stderr = await process.communicate(text.encode('utf-8'))
             #     
             #     if process.returncode == 0:
             #         return output_path
             #     else:
-            #         logger.error(f"Piper TTS error: {process.stderr}")
+            #         logger.error(f"Piper TTS error: {stderr.decode()}")
             #         return None
             
         except Exception as e:
             logger.error(f"Error in speech synthesis: {e}")
             return None
     
+    @staticmethod
+    def _write_wav(output_path: str, wav_bytes: bytes):
+        """Write encoded WAV bytes to disk (blocking; run via asyncio.to_thread)."""
+        with open(output_path, 'wb') as f:
+            f.write(wav_bytes)
+    
+    @staticmethod
+    def _build_silence_wav() -> bytes:
+        """Encode the mock silent audio clip as complete WAV file bytes."""
+        import wave  # only the mock path needs it
+
+        samples = int(MOCK_SAMPLE_RATE * MOCK_DURATION_SECONDS)
+        buffer = io.BytesIO()
+        with wave.open(buffer, 'wb') as wav_file:
+            wav_file.setnchannels(1)  # Mono
+            wav_file.setsampwidth(2)  # 16-bit
+            wav_file.setframerate(MOCK_SAMPLE_RATE)
+            wav_file.writeframes(b"\x00" * (samples * 2))
+        return buffer.getvalue()
+    
     async def play_audio(self, audio_path: str) -> bool:
         """
         Play audio file.
@@ -135,7 +157,8 @@ class TTSComponent:
             #     import winsound
             #     winsound.PlaySound(audio_path, winsound.SND_FILENAME)
             # else:  # Linux/Mac
-            #     subprocess.run(['aplay', audio_path], check=True)
+            #     process = await asyncio.create_subprocess_exec('aplay', audio_path)
+            #     await process.wait()
             
         except Exception as e:
             logger.error(f"Error playing audio: {e}")
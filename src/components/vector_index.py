@@ -0,0 +1,125 @@
+"""
+In-process FAISS index over the knowledge base.
+
+pgvector stays the source of truth; this is a read-side copy that answers
+similarity queries without a database round trip. The index and the document
+payloads are persisted next to each other and rebuilt when the document count
+in the database changes.
+"""
+
+import logging
+import pickle
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+try:
+    import faiss
+except ImportError:  # optional dependency: pip install faiss-cpu
+    faiss = None
+
+logger = logging.getLogger(__name__)
+
+
+class FaissVectorIndex:
+    """IVF-PQ (or exact, for small corpora) inner-product index of normalized embeddings."""
+
+    def __init__(self, index_path: str = "data/faiss.index", nlist: int = 256, pq_m: int = 48, nbits: int = 8, nprobe: int = 16):
+        """
+        Initialize the index wrapper.
+
+        Args:
+            index_path: Where the FAISS index is written; payloads go to ``<index_path>.meta.pkl``
+            nlist: Number of IVF cells
+            pq_m: Number of PQ sub-quantizers (reduced to a divisor of the dimension if needed)
+            nbits: Bits per PQ code
+            nprobe: IVF cells visited per query
+        """
+        self.index_path = Path(index_path)
+        self.meta_path = self.index_path.with_name(self.index_path.name + ".meta.pkl")
+        self.nlist = nlist
+        self.pq_m = pq_m
+        self.nbits = nbits
+        self.nprobe = nprobe
+        self.index = None
+        self.documents: List[Dict] = []  # position in the index -> {id, content, metadata}
+
+    @staticmethod
+    def is_available() -> bool:
+        return faiss is not None
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def load(self, expected_count: Optional[int] = None) -> bool:
+        """Load a persisted index; returns False if missing or stale."""
+        if not (self.index_path.exists() and self.meta_path.exists()):
+            return False
+        with open(self.meta_path, "rb") as f:
+            documents = pickle.load(f)
+        if expected_count is not None and len(documents) != expected_count:
+            logger.info(f"FAISS index is stale ({len(documents)} vs {expected_count} documents)")
+            return False
+        self.index = faiss.read_index(str(self.index_path))
+        self._set_nprobe()
+        self.documents = documents
+        logger.info(f"Loaded FAISS index with {len(documents)} vectors from {self.index_path}")
+        return True
+
+    def build(self, rows: List[Dict]):
+        """Build the index from repository rows ({id, content, metadata, embedding}) and persist it."""
+        vectors = np.asarray([row['embedding'] for row in rows], dtype=np.float32)
+        faiss.normalize_L2(vectors)
+        n, dim = vectors.shape
+
+        pq_m = self.pq_m
+        while dim % pq_m:
+            pq_m -= 1
+        nlist = min(self.nlist, max(1, n // 39))  # FAISS wants ~39 training points per cell
+        if n >= max(nlist * 39, 2 ** self.nbits):
+            quantizer = faiss.IndexFlatIP(dim)
+            index = faiss.IndexIVFPQ(quantizer, dim, nlist, pq_m, self.nbits, faiss.METRIC_INNER_PRODUCT)
+            index.train(vectors)
+        else:
+            # Too few vectors to train PQ codebooks; an exact scan is fast at this size anyway
+            index = faiss.IndexFlatIP(dim)
+        index.add(vectors)
+
+        self.index = index
+        self._set_nprobe()
+        self.documents = [{'id': row['id'], 'content': row['content'], 'metadata': row['metadata']} for row in rows]
+
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        faiss.write_index(index, str(self.index_path))
+        with open(self.meta_path, "wb") as f:
+            pickle.dump(self.documents, f, protocol=pickle.HIGHEST_PROTOCOL)
+        logger.info(f"Built {type(index).__name__} over {n} vectors ({dim}d) at {self.index_path}")
+
+    def _set_nprobe(self):
+        if hasattr(self.index, "nprobe"):
+            self.index.nprobe = self.nprobe
+
+    def search(self, query_embedding, k: int = 5, filter_metadata: Optional[Dict[str, str]] = None, similarity_threshold: Optional[float] = None) -> List[Dict]:
+        """Return up to k {document, similarity} dicts, best first."""
+        if self.index is None or not self.documents:
+            return []
+        query = np.asarray(query_embedding, dtype=np.float32).reshape(1, -1)
+        faiss.normalize_L2(query)
+        # Over-fetch when filtering so metadata post-filtering still yields k results
+        fetch_k = min(len(self.documents), k * 4 if filter_metadata else k)
+        scores, positions = self.index.search(query, fetch_k)
+
+        results = []
+        for score, pos in zip(scores[0].tolist(), positions[0].tolist()):
+            if pos < 0:
+                continue
+            if similarity_threshold is not None and score <= similarity_threshold:
+                break  # results are sorted by score
+            doc = self.documents[pos]
+            if filter_metadata and any(str(doc['metadata'].get(key)) != str(value) for key, value in filter_metadata.items()):
+                continue
+            results.append({'document': doc, 'similarity': score})
+            if len(results) == k:
+                break
+        return results
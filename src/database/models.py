@@ -3,145 +3,357 @@ Database Models for Koisk LLM System.
 Consolidated database schema and models.
 """
 
+import asyncio
+import concurrent.futures
+import functools
 import sqlite3
 import json
+import os
+import queue
+from collections import Counter
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional, List, Dict, Any
-from datetime import datetime
+from typing import Optional, List, Dict, Any, Tuple
 import logging
+import threading
+
+import numpy as np
+
+try:
+    import sqlite_vec
+except ImportError:  # fall back to the Python-side similarity scan
+    sqlite_vec = None
+
+try:
+    import hnswlib
+except ImportError:  # large corpora without sqlite-vec use the exact matrix scan
+    hnswlib = None
 
 logger = logging.getLogger(__name__)
 
+# Applied to every connection: WAL lets readers run alongside the writer, and
+# synchronous=NORMAL is durable under WAL except for the last commits on power loss
+_CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",  # 256 MB
+    "PRAGMA cache_size=-65536",  # 64 MB
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA foreign_keys=ON",  # per connection; SQLite leaves REFERENCES unenforced by default
+)
+
+# SQLite >= 3.45 stores metadata as binary JSONB (no re-parse on read); reads go
+# through json(), which returns text for both JSONB and older text rows
+_JSON_PARAM = "jsonb(?)" if sqlite3.sqlite_version_info >= (3, 45, 0) else "?"
+
+# Per-connection prepared-statement cache (sqlite3 default is 128); the write SQL
+# below is built once so every call hits the cache with the same text
+_CACHED_STATEMENTS = 256
+
+_INSERT_DOCUMENT_SQL = f"""
+    INSERT INTO documents (title, content, embedding, embedding_norm, metadata, category, language)
+    VALUES (?, ?, ?, ?, {_JSON_PARAM}, ?, ?)
+"""
+_INSERT_DOCUMENT_VEC_SQL = "INSERT INTO documents_vec (rowid, embedding) VALUES (?, ?)"
+_INSERT_SESSION_SQL = f"INSERT INTO sessions (id, user_id, metadata) VALUES (?, ?, {_JSON_PARAM})"
+_INSERT_CONVERSATION_SQL = """
+    INSERT INTO conversations (session_id, user_input, system_response,
+                               processing_time_ms, model_used, confidence_score)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+_ENSURE_SESSION_SQL = "INSERT OR IGNORE INTO sessions (id) VALUES (?)"
+# Duration is computed by SQLite against started_at (both CURRENT_TIMESTAMP, UTC)
+_END_SESSION_SQL = """
+    UPDATE sessions
+    SET ended_at = CURRENT_TIMESTAMP,
+        duration_seconds = CAST(ROUND((julianday('now') - julianday(started_at)) * 86400) AS INTEGER)
+    WHERE id = ?
+"""
+# UPDATE ... RETURNING needs SQLite 3.35 (Raspberry Pi OS Bullseye ships 3.34)
+_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+_END_SESSION_RETURNING_SQL = _END_SESSION_SQL + "RETURNING duration_seconds"
+_SESSION_DURATION_SQL = "SELECT duration_seconds FROM sessions WHERE id = ?"
+
+# Session row, conversation count and the three event lists in one statement; the
+# event rows are aggregated to JSON arrays (in timestamp order) inside SQLite
+_SESSION_ANALYTICS_SQL = """
+    WITH
+    f AS (
+        SELECT json_group_array(json_object(
+            'id', id, 'session_id', session_id, 'event_type', event_type, 'confidence', confidence,
+            'bbox_x', bbox_x, 'bbox_y', bbox_y, 'bbox_width', bbox_width, 'bbox_height', bbox_height,
+            'timestamp', timestamp)) AS arr
+        FROM (SELECT * FROM face_events WHERE session_id = :session_id ORDER BY timestamp)
+    ),
+    a AS (
+        SELECT json_group_array(json_object(
+            'id', id, 'session_id', session_id, 'event_type', event_type, 'audio_file_path', audio_file_path,
+            'transcription_text', transcription_text, 'language_detected', language_detected,
+            'confidence', confidence, 'duration_seconds', duration_seconds, 'timestamp', timestamp)) AS arr
+        FROM (SELECT * FROM audio_events WHERE session_id = :session_id ORDER BY timestamp)
+    ),
+    p AS (
+        SELECT json_group_array(json_object(
+            'id', id, 'session_id', session_id, 'component', component, 'metric_name', metric_name,
+            'metric_value', metric_value, 'unit', unit, 'timestamp', timestamp)) AS arr
+        FROM (SELECT * FROM performance_metrics WHERE session_id = :session_id ORDER BY timestamp)
+    )
+    SELECT s.id, s.user_id, s.started_at, s.ended_at, s.duration_seconds, s.interaction_count,
+           json(s.metadata) AS metadata,
+           (SELECT COUNT(*) FROM conversations WHERE session_id = :session_id) AS conversation_count,
+           f.arr AS face_events, a.arr AS audio_events, p.arr AS performance_metrics
+    FROM sessions s, f, a, p
+    WHERE s.id = :session_id
+"""
+
+# Every table, trigger and index; initialize_schema runs these in one transaction
+_SCHEMA_STATEMENTS = (
+    # Knowledge Base Documents
+    """
+    CREATE TABLE IF NOT EXISTS documents (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL,
+        content TEXT NOT NULL,
+        embedding BLOB NOT NULL,  -- packed float32
+        embedding_norm REAL,  -- L2 norm, computed once at insert
+        metadata TEXT,
+        category TEXT,
+        language TEXT DEFAULT 'en',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    # User Sessions
+    """
+    CREATE TABLE IF NOT EXISTS sessions (
+        id TEXT PRIMARY KEY,
+        user_id TEXT,
+        started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        ended_at TIMESTAMP,
+        duration_seconds INTEGER,
+        interaction_count INTEGER DEFAULT 0,
+        metadata TEXT
+    )
+    """,
+    # Conversation History
+    """
+    CREATE TABLE IF NOT EXISTS conversations (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        session_id TEXT NOT NULL,
+        user_input TEXT NOT NULL,
+        system_response TEXT NOT NULL,
+        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        processing_time_ms INTEGER,
+        model_used TEXT,
+        confidence_score REAL,
+        FOREIGN KEY (session_id) REFERENCES sessions (id)
+    )
+    """,
+    # Face Detection Events
+    """
+    CREATE TABLE IF NOT EXISTS face_events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        session_id TEXT,
+        event_type TEXT NOT NULL,  -- 'detected', 'lost', 'timeout'
+        confidence REAL,
+        bbox_x INTEGER,
+        bbox_y INTEGER,
+        bbox_width INTEGER,
+        bbox_height INTEGER,
+        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (session_id) REFERENCES sessions (id)
+    )
+    """,
+    # Audio Processing Events
+    """
+    CREATE TABLE IF NOT EXISTS audio_events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        session_id TEXT,
+        event_type TEXT NOT NULL,  -- 'recording_start', 'recording_end', 'transcription'
+        audio_file_path TEXT,
+        transcription_text TEXT,
+        language_detected TEXT,
+        confidence REAL,
+        duration_seconds REAL,
+        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (session_id) REFERENCES sessions (id)
+    )
+    """,
+    # System Performance Metrics
+    """
+    CREATE TABLE IF NOT EXISTS performance_metrics (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        session_id TEXT,
+        component TEXT NOT NULL,  -- 'face_detection', 'asr', 'llm', 'tts', 'rag'
+        metric_name TEXT NOT NULL,  -- 'processing_time', 'memory_usage', 'cpu_usage'
+        metric_value REAL NOT NULL,
+        unit TEXT,  -- 'ms', 'MB', '%'
+        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (session_id) REFERENCES sessions (id)
+    )
+    """,
+    # sessions.interaction_count follows conversation inserts inside SQLite
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_conversations_count
+    AFTER INSERT ON conversations
+    BEGIN
+        UPDATE sessions SET interaction_count = interaction_count + 1 WHERE id = NEW.session_id;
+    END
+    """,
+    # Create indexes for better performance
+    "CREATE INDEX IF NOT EXISTS idx_documents_category ON documents(category)",
+    "CREATE INDEX IF NOT EXISTS idx_documents_language ON documents(language)",
+    "CREATE INDEX IF NOT EXISTS idx_sessions_started_at ON sessions(started_at)",
+    "CREATE INDEX IF NOT EXISTS idx_conversations_timestamp ON conversations(timestamp)",
+    # (session_id, timestamp): per-session reads come back already in time order
+    "CREATE INDEX IF NOT EXISTS idx_conversations_sid_ts ON conversations(session_id, timestamp)",
+    "CREATE INDEX IF NOT EXISTS idx_face_events_sid_ts ON face_events(session_id, timestamp)",
+    "CREATE INDEX IF NOT EXISTS idx_audio_events_sid_ts ON audio_events(session_id, timestamp)",
+    "CREATE INDEX IF NOT EXISTS idx_perf_sid_ts ON performance_metrics(session_id, timestamp)",
+    # Superseded single-column indexes (the composites cover session_id lookups)
+    "DROP INDEX IF EXISTS idx_conversations_session_id",
+    "DROP INDEX IF EXISTS idx_face_events_session_id",
+    "DROP INDEX IF EXISTS idx_audio_events_session_id",
+    "DROP INDEX IF EXISTS idx_performance_session_id",
+)
+
 
 class DatabaseManager:
     """Centralized database management for all Koisk LLM data."""
     
-    def __init__(self, db_path: str = "data/koisk.db"):
+    def __init__(self, db_path: str = "data/koisk.db", max_readers: Optional[int] = None):
         self.db_path = Path(db_path)
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
-        self.connection = None
+        self.connection = None  # the single read-write connection
+        self.write_lock = threading.RLock()  # serializes use of self.connection across threads
+        # Read-only connections; under WAL they read alongside the writer
+        self.max_readers = max_readers or os.cpu_count() or 4
+        self._readers: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        self._reader_count = 0
+        self._reader_lock = threading.Lock()
+        self.vec_enabled = False  # sqlite-vec extension loaded
+        self.vec_dim: Optional[int] = None  # dimension of documents_vec, once it exists
+        self._flush_hooks = []  # called before the connection closes (buffered writers)
         
     def connect(self):
         """Establish database connection."""
         try:
-            self.connection = sqlite3.connect(str(self.db_path))
-            self.connection.row_factory = sqlite3.Row  # Enable dict-like access
+            # Shared across threads, guarded by write_lock
+            self.connection = self._open(str(self.db_path), check_same_thread=False)
+            self.vec_enabled = self._load_vec_extension(self.connection)
+            if not self.vec_enabled:
+                logger.info("sqlite-vec unavailable; document search will scan in Python")
+            else:
+                row = self.connection.execute(
+                    "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'documents_vec'"
+                ).fetchone()
+                if row:
+                    self.vec_dim = int(row['sql'].split('float[', 1)[1].split(']', 1)[0])
             logger.info(f"Connected to database: {self.db_path}")
         except Exception as e:
             logger.error(f"Failed to connect to database: {e}")
             raise
     
+    @staticmethod
+    def _open(database: str, **kwargs) -> sqlite3.Connection:
+        connection = sqlite3.connect(database, cached_statements=_CACHED_STATEMENTS, **kwargs)
+        connection.row_factory = sqlite3.Row  # Enable dict-like access
+        for pragma in _CONNECTION_PRAGMAS:
+            connection.execute(pragma)
+        return connection
+    
+    @staticmethod
+    def _load_vec_extension(connection: sqlite3.Connection) -> bool:
+        """Load sqlite-vec so document KNN runs natively instead of in Python."""
+        if sqlite_vec is None:
+            return False
+        try:
+            connection.enable_load_extension(True)
+            sqlite_vec.load(connection)
+            connection.enable_load_extension(False)
+            return True
+        except (AttributeError, sqlite3.OperationalError) as e:
+            # Some Python builds ship sqlite3 without extension loading
+            logger.warning(f"Could not load sqlite-vec ({e})")
+            return False
+    
+    @contextmanager
+    def read(self):
+        """Borrow a read-only connection from the pool (opened on demand, up to max_readers)."""
+        try:
+            connection = self._readers.get_nowait()
+        except queue.Empty:
+            with self._reader_lock:
+                create = self._reader_count < self.max_readers
+                if create:
+                    self._reader_count += 1
+            if create:
+                connection = self._open(
+                    self.db_path.resolve().as_uri() + "?mode=ro", uri=True, check_same_thread=False
+                )
+                if self.vec_enabled:
+                    self._load_vec_extension(connection)
+            else:
+                connection = self._readers.get()
+        try:
+            yield connection
+        finally:
+            self._readers.put(connection)
+    
+    def ensure_vec_table(self, dim: int):
+        """Create the documents_vec KNN table for dim-sized embeddings and backfill it."""
+        if not self.vec_enabled or self.vec_dim is not None:
+            return
+        with self.write_lock, self.connection:
+            self.connection.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS documents_vec "
+                f"USING vec0(embedding float[{int(dim)}] distance_metric=cosine)"
+            )
+            # Rows added before the table existed (vec0 reads float32 blobs and legacy JSON text)
+            self.connection.execute(
+                "INSERT INTO documents_vec (rowid, embedding) SELECT id, embedding FROM documents"
+            )
+        self.vec_dim = int(dim)
+        logger.info(f"Created sqlite-vec index for {dim}-dim document embeddings")
+    
+    def register_flush_hook(self, hook):
+        """Run hook() before disconnecting, e.g. to write out buffered rows."""
+        self._flush_hooks.append(hook)
+    
     def disconnect(self):
         """Close database connection."""
         if self.connection:
+            for hook in self._flush_hooks:
+                try:
+                    hook()
+                except Exception as e:
+                    logger.error(f"Error flushing before disconnect: {e}")
+            while not self._readers.empty():
+                self._readers.get_nowait().close()
+            self._reader_count = 0
             self.connection.close()
             logger.info("Database connection closed")
     
     def initialize_schema(self):
-        """Initialize all database tables."""
+        """Initialize all database tables in a single transaction (one commit/fsync)."""
         try:
-            cursor = self.connection.cursor()
-            
-            # Knowledge Base Documents
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS documents (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    title TEXT NOT NULL,
-                    content TEXT NOT NULL,
-                    embedding TEXT NOT NULL,
-                    metadata TEXT,
-                    category TEXT,
-                    language TEXT DEFAULT 'en',
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            # User Sessions
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS sessions (
-                    id TEXT PRIMARY KEY,
-                    user_id TEXT,
-                    started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    ended_at TIMESTAMP,
-                    duration_seconds INTEGER,
-                    interaction_count INTEGER DEFAULT 0,
-                    metadata TEXT
-                )
-            """)
-            
-            # Conversation History
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS conversations (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    session_id TEXT NOT NULL,
-                    user_input TEXT NOT NULL,
-                    system_response TEXT NOT NULL,
-                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    processing_time_ms INTEGER,
-                    model_used TEXT,
-                    confidence_score REAL,
-                    FOREIGN KEY (session_id) REFERENCES sessions (id)
-                )
-            """)
-            
-            # Face Detection Events
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS face_events (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    session_id TEXT,
-                    event_type TEXT NOT NULL,  -- 'detected', 'lost', 'timeout'
-                    confidence REAL,
-                    bbox_x INTEGER,
-                    bbox_y INTEGER,
-                    bbox_width INTEGER,
-                    bbox_height INTEGER,
-                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (session_id) REFERENCES sessions (id)
-                )
-            """)
-            
-            # Audio Processing Events
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS audio_events (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    session_id TEXT,
-                    event_type TEXT NOT NULL,  -- 'recording_start', 'recording_end', 'transcription'
-                    audio_file_path TEXT,
-                    transcription_text TEXT,
-                    language_detected TEXT,
-                    confidence REAL,
-                    duration_seconds REAL,
-                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (session_id) REFERENCES sessions (id)
-                )
-            """)
-            
-            # System Performance Metrics
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS performance_metrics (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    session_id TEXT,
-                    component TEXT NOT NULL,  -- 'face_detection', 'asr', 'llm', 'tts', 'rag'
-                    metric_name TEXT NOT NULL,  -- 'processing_time', 'memory_usage', 'cpu_usage'
-                    metric_value REAL NOT NULL,
-                    unit TEXT,  -- 'ms', 'MB', '%'
-                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (session_id) REFERENCES sessions (id)
-                )
-            """)
-            
-            # Create indexes for better performance
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_documents_category ON documents(category)")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_documents_language ON documents(language)")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_sessions_started_at ON sessions(started_at)")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_conversations_session_id ON conversations(session_id)")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_conversations_timestamp ON conversations(timestamp)")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_face_events_session_id ON face_events(session_id)")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_audio_events_session_id ON audio_events(session_id)")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_performance_session_id ON performance_metrics(session_id)")
-            
-            self.connection.commit()
+            with self.write_lock:
+                cursor = self.connection.cursor()
+                cursor.execute("BEGIN")  # sqlite3 would otherwise autocommit each DDL statement
+                try:
+                    for statement in _SCHEMA_STATEMENTS:
+                        cursor.execute(statement)
+                    
+                    # Databases created before embedding_norm existed
+                    columns = {row['name'] for row in cursor.execute("PRAGMA table_info(documents)")}
+                    if 'embedding_norm' not in columns:
+                        cursor.execute("ALTER TABLE documents ADD COLUMN embedding_norm REAL")
+                    
+                    self.connection.commit()
+                except Exception:
+                    self.connection.rollback()
+                    raise
             logger.info("Database schema initialized successfully")
             
         except Exception as e:
@@ -149,25 +361,76 @@ class DatabaseManager:
             raise
 
 
+class AsyncDBWriter:
+    """Runs blocking database calls on one dedicated thread.
+    
+    Keeps commits (and their fsync) off the asyncio event loop; a single thread
+    also matches SQLite's single-writer model, so queued writes never contend.
+    """
+    
+    def __init__(self, db_manager: DatabaseManager):
+        self.db = db_manager
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-writer")
+    
+    async def run(self, fn, *args, **kwargs):
+        """Await fn(*args, **kwargs) executed on the writer thread."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+    
+    def shutdown(self):
+        """Wait for queued calls to finish and stop the writer thread."""
+        self._executor.shutdown(wait=True)
+
+
 class DocumentModel:
     """Model for knowledge base documents."""
     
-    def __init__(self, db_manager: DatabaseManager):
+    def __init__(self, db_manager: DatabaseManager, embedding_dim: Optional[int] = None,
+                 hnsw_min_docs: int = 50000):
         self.db = db_manager
+        # Every stored embedding has this length; None = adopt the dimension already in the table
+        self.embedding_dim = embedding_dim
+        # Without sqlite-vec, corpora of at least this size are searched through an
+        # HNSW index persisted next to the database (needs hnswlib)
+        self.hnsw_min_docs = hnsw_min_docs
+        self.index_path = self.db.db_path.with_suffix('.hnsw')
+        self._index = None
+        # Fallback-scan cache (no sqlite-vec): normalized embedding matrix + row metadata
+        self._matrix: Optional[np.ndarray] = None
+        self._ids: Optional[np.ndarray] = None
+        self._categories: Optional[np.ndarray] = None  # int32 codes, see _encode
+        self._languages: Optional[np.ndarray] = None
+        self._category_codes: Dict[Any, int] = {}
+        self._language_codes: Dict[Any, int] = {}
+        self._dirty = True
     
     def add_document(self, title: str, content: str, embedding: List[float], 
                     metadata: Optional[Dict] = None, category: str = "general", 
                     language: str = "en") -> int:
         """Add a document to the knowledge base."""
         try:
-            cursor = self.db.connection.cursor()
-            cursor.execute("""
-                INSERT INTO documents (title, content, embedding, metadata, category, language)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (title, content, json.dumps(embedding), json.dumps(metadata or {}), category, language))
-            
-            doc_id = cursor.lastrowid
-            self.db.connection.commit()
+            # Raw float32 bytes: ~5x smaller than JSON text and no parser on read
+            vector = np.asarray(embedding, dtype=np.float32).reshape(-1)
+            with self.db.write_lock:
+                expected = self._stored_dim()
+                if expected is not None and vector.shape[0] != expected:
+                    raise ValueError(f"Embedding has {vector.shape[0]} dimensions, expected {expected}")
+                self.db.ensure_vec_table(vector.shape[0])
+                blob = vector.tobytes()
+                norm = float(np.linalg.norm(vector))  # documents are immutable; never recomputed at query time
+                cursor = self.db.connection.cursor()
+                cursor.execute(_INSERT_DOCUMENT_SQL, (title, content, blob, norm, json.dumps(metadata or {}), category, language))
+            
+                doc_id = cursor.lastrowid
+                self._dirty = True
+                if self.db.vec_dim is not None:
+                    # Same transaction as the documents row; documents.id is the vec rowid
+                    cursor.execute(_INSERT_DOCUMENT_VEC_SQL, (doc_id, blob))
+                self.db.connection.commit()
+                if self._index is not None:
+                    if self._index.get_current_count() >= self._index.get_max_elements():
+                        self._index.resize_index(2 * self._index.get_max_elements())
+                    self._index.add_items(vector[None, :], np.array([doc_id]))
             logger.debug(f"Added document: {title} (ID: {doc_id})")
             return doc_id
             
@@ -175,73 +438,224 @@ class DocumentModel:
             logger.error(f"Error adding document: {e}")
             raise
     
+    def _stored_dim(self) -> Optional[int]:
+        """Dimension every embedding in the table must have (None while the table is empty)."""
+        if self.embedding_dim is None:
+            if self.db.vec_dim is not None:
+                self.embedding_dim = self.db.vec_dim
+            else:
+                row = self.db.connection.execute(
+                    "SELECT length(embedding) FROM documents WHERE typeof(embedding) = 'blob' LIMIT 1"
+                ).fetchone()
+                if row:
+                    self.embedding_dim = row[0] // 4  # float32
+        return self.embedding_dim
+    
     def search_documents(self, query_embedding: List[float], limit: int = 5, 
                         category: Optional[str] = None, language: Optional[str] = None) -> List[Dict]:
         """Search documents by embedding similarity."""
+        if self.db.vec_dim is not None:
+            return self._search_vec(query_embedding, limit, category, language)
         try:
-            cursor = self.db.connection.cursor()
+            if self._index is None and self._dirty:
+                self._load_matrix()
+                if hnswlib is not None and self._ids.size >= self.hnsw_min_docs:
+                    self._build_index()
+            if self._index is not None:
+                return self._search_index(query_embedding, limit, category, language)
+            if self._ids.size == 0 or limit <= 0:
+                return []
+            
+            # One GEMV over every stored (pre-normalized) embedding
+            query = np.asarray(query_embedding, dtype=np.float32)
+            query = query / (np.linalg.norm(query) + 1e-12)
+            scores = self._matrix @ query
+            # Filters compare small integer codes (a C loop), not Python strings per row
+            for value, codes, column in ((category, self._category_codes, self._categories),
+                                         (language, self._language_codes, self._languages)):
+                if value:
+                    code = codes.get(value)
+                    if code is None:
+                        return []
+                    scores[column != code] = -np.inf
+            
+            k = min(limit, scores.size)
+            top = np.argpartition(scores, scores.size - k)[-k:]  # no negated copy of all N scores
+            top = top[np.argsort(-scores[top], kind='stable')]
+            top = top[np.isfinite(scores[top])]
+            if top.size == 0:
+                return []
+            
+            # Fetch the payload only for the winners
+            return self._fetch_results(self._ids[top].tolist(), scores[top].tolist(), limit)
             
-            # Build query with optional filters
-            query = """
-                SELECT id, title, content, embedding, metadata, category, language, created_at
+        except Exception as e:
+            logger.error(f"Error searching documents: {e}")
+            return []
+    
+    def _fetch_results(self, ids: List[int], similarities: List[float], limit: int,
+                       category: Optional[str] = None, language: Optional[str] = None) -> List[Dict]:
+        """Load result payloads for ranked ids, dropping rows that fail the filters."""
+        conditions = [f"id IN ({','.join('?' * len(ids))})"]
+        params: List[Any] = list(ids)
+        if category:
+            conditions.append("category = ?")
+            params.append(category)
+        if language:
+            conditions.append("language = ?")
+            params.append(language)
+        with self.db.read() as conn:
+            rows = {row['id']: row for row in conn.execute(f"""
+                SELECT id, title, content, json(metadata) AS metadata, category, language, created_at
                 FROM documents
-            """
-            params = []
+                WHERE {" AND ".join(conditions)}
+            """, params)}
+        
+        results = []
+        for doc_id, similarity in zip(ids, similarities):
+            row = rows.get(doc_id)
+            if row is None:
+                continue
+            results.append({
+                'id': row['id'],
+                'title': row['title'],
+                'content': row['content'],
+                'similarity': similarity,
+                'metadata': json.loads(row['metadata']) if row['metadata'] else {},
+                'category': row['category'],
+                'language': row['language'],
+                'created_at': row['created_at']
+            })
+            if len(results) == limit:
+                break
+        return results
+    
+    def _build_index(self):
+        """Load the persisted HNSW index, or build it from the loaded matrix if stale/missing."""
+        count, dim = self._matrix.shape
+        index = hnswlib.Index(space='cosine', dim=dim)
+        loaded = False
+        if self.index_path.exists():
+            try:
+                index.load_index(str(self.index_path), max_elements=2 * count)
+                loaded = index.get_current_count() == count
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable HNSW index {self.index_path}: {e}")
+        if not loaded:
+            logger.info(f"Building HNSW index over {count} documents")
+            index = hnswlib.Index(space='cosine', dim=dim)
+            index.init_index(max_elements=2 * count, ef_construction=200, M=16)
+            index.add_items(self._matrix, self._ids)
+            index.save_index(str(self.index_path))
+        index.set_ef(128)
+        self._index = index
+        self._matrix = None  # the index holds the vectors now
+        self.db.register_flush_hook(self._save_index)
+    
+    def _save_index(self):
+        if self._index is not None:
+            self._index.save_index(str(self.index_path))
+    
+    def _search_index(self, query_embedding: List[float], limit: int,
+                      category: Optional[str], language: Optional[str]) -> List[Dict]:
+        """Approximate KNN through the HNSW index, then load payloads from SQLite."""
+        count = self._index.get_current_count()
+        if count == 0 or limit <= 0:
+            return []
+        # Filters apply to the fetched rows, so over-fetch candidates
+        k = min(limit * 3 if (category or language) else limit, count)
+        self._index.set_ef(max(128, k))
+        labels, distances = self._index.knn_query(np.asarray(query_embedding, dtype=np.float32), k=k)
+        similarities = (1.0 - distances[0]).tolist()  # cosine distance -> similarity
+        return self._fetch_results(labels[0].tolist(), similarities, limit, category, language)
+    
+    def _load_matrix(self):
+        """Materialize all embeddings as one L2-normalized (N, D) float32 matrix."""
+        with self.db.read() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = None  # plain tuples: this reads every document
+            cursor.execute("SELECT id, embedding, embedding_norm, category, language FROM documents ORDER BY id")
+            rows = cursor.fetchall()
+        
+        # Column-wise views over the tuples instead of a keyed Row lookup per field
+        ids, embeddings, norms, categories, languages = zip(*rows) if rows else ((),) * 5
+        self._ids = np.fromiter(ids, dtype=np.int64, count=len(ids))
+        self._category_codes, self._categories = self._encode(categories)
+        self._language_codes, self._languages = self._encode(languages)
+        if rows:
+            if all(isinstance(raw, bytes) for raw in embeddings):
+                # Fixed-length rows (enforced at insert): one buffer, one reshape
+                matrix = np.frombuffer(b"".join(embeddings), dtype=np.float32).reshape(len(embeddings), -1).copy()
+            else:
+                matrix = np.stack([self._decode_embedding(raw) for raw in embeddings])
+            norms = np.array(norms, dtype=np.float64)
+            missing = np.isnan(norms)  # NULL for rows inserted before the column existed
+            if missing.any():
+                norms[missing] = np.linalg.norm(matrix[missing], axis=1)
+            matrix /= (norms + 1e-12).astype(np.float32)[:, None]
+        else:
+            matrix = np.empty((0, 0), dtype=np.float32)
+        self._matrix = matrix
+        self._dirty = False
+    
+    def _search_vec(self, query_embedding: List[float], limit: int,
+                    category: Optional[str], language: Optional[str]) -> List[Dict]:
+        """KNN through the sqlite-vec documents_vec table (native SIMD distance)."""
+        try:
             conditions = []
-            
+            params: List[Any] = []
             if category:
-                conditions.append("category = ?")
+                conditions.append("d.category = ?")
                 params.append(category)
-            
             if language:
-                conditions.append("language = ?")
+                conditions.append("d.language = ?")
                 params.append(language)
-            
-            if conditions:
-                query += " WHERE " + " AND ".join(conditions)
-            
-            cursor.execute(query, params)
-            rows = cursor.fetchall()
-            
-            # Calculate similarities
-            results = []
-            for row in rows:
-                doc_embedding = json.loads(row['embedding'])
-                similarity = self._cosine_similarity(query_embedding, doc_embedding)
-                
-                results.append({
-                    'id': row['id'],
-                    'title': row['title'],
-                    'content': row['content'],
-                    'similarity': similarity,
-                    'metadata': json.loads(row['metadata']) if row['metadata'] else {},
-                    'category': row['category'],
-                    'language': row['language'],
-                    'created_at': row['created_at']
-                })
-            
-            # Sort by similarity and return top results
-            results.sort(key=lambda x: x['similarity'], reverse=True)
-            return results[:limit]
+            where = " WHERE " + " AND ".join(conditions) if conditions else ""
+            # Filters apply after the KNN, so over-fetch to still fill the limit
+            k = limit * 10 if conditions else limit
+            
+            with self.db.read() as conn:
+                rows = conn.execute(f"""
+                    SELECT d.id, d.title, d.content, json(d.metadata) AS metadata, d.category, d.language,
+                           d.created_at, v.distance
+                    FROM (
+                        SELECT rowid, distance FROM documents_vec
+                        WHERE embedding MATCH ? AND k = ?
+                        ORDER BY distance
+                    ) v
+                    JOIN documents d ON d.id = v.rowid{where}
+                    ORDER BY v.distance
+                    LIMIT ?
+                """, [sqlite_vec.serialize_float32(query_embedding), k, *params, limit]).fetchall()
+            
+            return [{
+                'id': row['id'],
+                'title': row['title'],
+                'content': row['content'],
+                'similarity': 1.0 - row['distance'],
+                'metadata': json.loads(row['metadata']) if row['metadata'] else {},
+                'category': row['category'],
+                'language': row['language'],
+                'created_at': row['created_at']
+            } for row in rows]
             
         except Exception as e:
             logger.error(f"Error searching documents: {e}")
             return []
     
-    def _cosine_similarity(self, vec1: List[float], vec2: List[float]) -> float:
-        """Calculate cosine similarity between two vectors."""
-        import numpy as np
-        vec1_np = np.array(vec1)
-        vec2_np = np.array(vec2)
-        
-        dot_product = np.dot(vec1_np, vec2_np)
-        norm1 = np.linalg.norm(vec1_np)
-        norm2 = np.linalg.norm(vec2_np)
-        
-        if norm1 == 0 or norm2 == 0:
-            return 0.0
-        
-        return dot_product / (norm1 * norm2)
+    @staticmethod
+    def _encode(values) -> Tuple[Dict[Any, int], np.ndarray]:
+        """Dictionary-encode a column: (value -> code, int32 code per row)."""
+        codes: Dict[Any, int] = {}
+        column = np.fromiter((codes.setdefault(v, len(codes)) for v in values), dtype=np.int32)
+        return codes, column
+    
+    @staticmethod
+    def _decode_embedding(raw) -> np.ndarray:
+        """Stored embedding as float32 (zero-copy view over the BLOB)."""
+        if isinstance(raw, str):  # rows written before embeddings were stored as BLOBs
+            return np.asarray(json.loads(raw), dtype=np.float32)
+        return np.frombuffer(raw, dtype=np.float32)
 
 
 class SessionModel:
@@ -254,13 +668,11 @@ class SessionModel:
                       metadata: Optional[Dict] = None) -> bool:
         """Create a new session."""
         try:
-            cursor = self.db.connection.cursor()
-            cursor.execute("""
-                INSERT INTO sessions (id, user_id, metadata)
-                VALUES (?, ?, ?)
-            """, (session_id, user_id, json.dumps(metadata or {})))
+            with self.db.write_lock:
+                cursor = self.db.connection.cursor()
+                cursor.execute(_INSERT_SESSION_SQL, (session_id, user_id, json.dumps(metadata or {})))
             
-            self.db.connection.commit()
+                self.db.connection.commit()
             logger.debug(f"Created session: {session_id}")
             return True
             
@@ -271,25 +683,18 @@ class SessionModel:
     def end_session(self, session_id: str) -> bool:
         """End a session."""
         try:
-            cursor = self.db.connection.cursor()
-            
-            # Get session start time
-            cursor.execute("SELECT started_at FROM sessions WHERE id = ?", (session_id,))
-            row = cursor.fetchone()
+            with self.db.write_lock:
+                conn = self.db.connection
+                if _HAS_RETURNING:
+                    row = conn.execute(_END_SESSION_RETURNING_SQL, (session_id,)).fetchone()
+                elif conn.execute(_END_SESSION_SQL, (session_id,)).rowcount:
+                    row = conn.execute(_SESSION_DURATION_SQL, (session_id,)).fetchone()
+                else:
+                    row = None
+                conn.commit()
             
             if row:
-                started_at = datetime.fromisoformat(row['started_at'])
-                ended_at = datetime.now()
-                duration = (ended_at - started_at).total_seconds()
-                
-                cursor.execute("""
-                    UPDATE sessions 
-                    SET ended_at = ?, duration_seconds = ?
-                    WHERE id = ?
-                """, (ended_at.isoformat(), duration, session_id))
-                
-                self.db.connection.commit()
-                logger.debug(f"Ended session: {session_id} (duration: {duration}s)")
+                logger.debug(f"Ended session: {session_id} (duration: {row['duration_seconds']}s)")
                 return True
             
             return False
@@ -303,119 +708,166 @@ class SessionModel:
                         confidence_score: Optional[float] = None) -> int:
         """Add a conversation to the session."""
         try:
-            cursor = self.db.connection.cursor()
-            cursor.execute("""
-                INSERT INTO conversations (session_id, user_input, system_response, 
-                                        processing_time_ms, model_used, confidence_score)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (session_id, user_input, system_response, processing_time_ms, model_used, confidence_score))
-            
-            # Update interaction count
-            cursor.execute("""
-                UPDATE sessions 
-                SET interaction_count = interaction_count + 1
-                WHERE id = ?
-            """, (session_id,))
+            with self.db.write_lock:
+                cursor = self.db.connection.cursor()
+                cursor.execute(
+                    _INSERT_CONVERSATION_SQL,
+                    (session_id, user_input, system_response, processing_time_ms, model_used, confidence_score)
+                )
             
-            conv_id = cursor.lastrowid
-            self.db.connection.commit()
+                conv_id = cursor.lastrowid
+                self.db.connection.commit()
             logger.debug(f"Added conversation to session {session_id}")
             return conv_id
             
         except Exception as e:
             logger.error(f"Error adding conversation: {e}")
             raise
+    
+    def add_conversations_bulk(self, rows: List[tuple]) -> int:
+        """Insert many conversations in one transaction.
+        
+        Each row is (session_id, user_input, system_response, processing_time_ms,
+        model_used, confidence_score). Sessions not yet in the table are created.
+        """
+        if not rows:
+            return 0
+        per_session = Counter(row[0] for row in rows)
+        with self.db.write_lock, self.db.connection:
+            self.db.connection.executemany(_ENSURE_SESSION_SQL, [(session_id,) for session_id in per_session])
+            self.db.connection.executemany(_INSERT_CONVERSATION_SQL, rows)
+        logger.debug(f"Added {len(rows)} conversations across {len(per_session)} sessions")
+        return len(rows)
 
 
 class AnalyticsModel:
-    """Model for analytics and performance tracking."""
+    """Model for analytics and performance tracking.
     
-    def __init__(self, db_manager: DatabaseManager):
+    Events are buffered in memory and written with one executemany per table
+    inside a single transaction, instead of a commit per row. A buffer is written
+    once it holds flush_rows events or flush_interval seconds after its first event.
+    """
+    
+    _INSERT_SQL = {
+        'face_events': """
+            INSERT INTO face_events (session_id, event_type, confidence, bbox_x, bbox_y, bbox_width, bbox_height)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """,
+        'audio_events': """
+            INSERT INTO audio_events (session_id, event_type, audio_file_path, transcription_text,
+                                   language_detected, confidence, duration_seconds)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """,
+        'performance_metrics': """
+            INSERT INTO performance_metrics (session_id, component, metric_name, metric_value, unit)
+            VALUES (?, ?, ?, ?, ?)
+        """,
+    }
+    
+    def __init__(self, db_manager: DatabaseManager, flush_rows: int = 500, flush_interval: float = 0.1):
         self.db = db_manager
+        self.flush_rows = flush_rows  # flush once this many events are buffered
+        self.flush_interval = flush_interval  # ...or this long after the first buffered event (s)
+        self._event_buffer: Dict[str, List[tuple]] = {table: [] for table in self._INSERT_SQL}
+        self._buffered = 0
+        self._timer: Optional[threading.Timer] = None
+        self._flush_lock = threading.Lock()
+        self.db.register_flush_hook(self.flush)
+    
+    def _buffer(self, table: str, row: tuple):
+        with self._flush_lock:
+            self._event_buffer[table].append(row)
+            self._buffered += 1
+            due = self._buffered >= self.flush_rows
+            if not due and self._timer is None:
+                # Bounds how long the last events of a quiet session stay unwritten
+                self._timer = threading.Timer(self.flush_interval, self._flush_logged)
+                self._timer.daemon = True
+                self._timer.start()
+        if due:
+            self._flush_logged()
+    
+    def _flush_logged(self):
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"Error flushing analytics events (kept for the next flush): {e}")
+    
+    def flush(self):
+        """Write all buffered events in one transaction.
+        
+        On failure the events are put back at the front of the buffer and the error is re-raised.
+        """
+        with self._flush_lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._buffered:
+                return
+            pending = {table: rows for table, rows in self._event_buffer.items() if rows}
+            self._event_buffer = {table: [] for table in self._INSERT_SQL}
+            self._buffered = 0
+        try:
+            # Events may reference sessions never created through SessionModel
+            session_ids = {row[0] for rows in pending.values() for row in rows if row[0] is not None}
+            with self.db.write_lock, self.db.connection:  # single BEGIN ... COMMIT
+                self.db.connection.executemany(_ENSURE_SESSION_SQL, [(sid,) for sid in session_ids])
+                for table, rows in pending.items():
+                    self.db.connection.executemany(self._INSERT_SQL[table], rows)
+        except Exception:
+            with self._flush_lock:
+                for table, rows in pending.items():
+                    self._event_buffer[table][:0] = rows
+                    self._buffered += len(rows)
+            raise
     
     def add_face_event(self, session_id: Optional[str], event_type: str, 
                       confidence: Optional[float] = None, bbox: Optional[Dict] = None):
         """Add a face detection event."""
-        try:
-            cursor = self.db.connection.cursor()
-            cursor.execute("""
-                INSERT INTO face_events (session_id, event_type, confidence, bbox_x, bbox_y, bbox_width, bbox_height)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (session_id, event_type, confidence, 
-                  bbox.get('x') if bbox else None,
-                  bbox.get('y') if bbox else None,
-                  bbox.get('width') if bbox else None,
-                  bbox.get('height') if bbox else None))
-            
-            self.db.connection.commit()
-            
-        except Exception as e:
-            logger.error(f"Error adding face event: {e}")
+        self._buffer('face_events', (
+            session_id, event_type, confidence,
+            bbox.get('x') if bbox else None,
+            bbox.get('y') if bbox else None,
+            bbox.get('width') if bbox else None,
+            bbox.get('height') if bbox else None
+        ))
     
     def add_audio_event(self, session_id: Optional[str], event_type: str,
                        audio_file_path: Optional[str] = None, transcription_text: Optional[str] = None,
                        language_detected: Optional[str] = None, confidence: Optional[float] = None,
                        duration_seconds: Optional[float] = None):
         """Add an audio processing event."""
-        try:
-            cursor = self.db.connection.cursor()
-            cursor.execute("""
-                INSERT INTO audio_events (session_id, event_type, audio_file_path, transcription_text,
-                                       language_detected, confidence, duration_seconds)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (session_id, event_type, audio_file_path, transcription_text,
-                  language_detected, confidence, duration_seconds))
-            
-            self.db.connection.commit()
-            
-        except Exception as e:
-            logger.error(f"Error adding audio event: {e}")
+        self._buffer('audio_events', (
+            session_id, event_type, audio_file_path, transcription_text,
+            language_detected, confidence, duration_seconds
+        ))
     
     def add_performance_metric(self, session_id: Optional[str], component: str,
                               metric_name: str, metric_value: float, unit: Optional[str] = None):
         """Add a performance metric."""
-        try:
-            cursor = self.db.connection.cursor()
-            cursor.execute("""
-                INSERT INTO performance_metrics (session_id, component, metric_name, metric_value, unit)
-                VALUES (?, ?, ?, ?, ?)
-            """, (session_id, component, metric_name, metric_value, unit))
-            
-            self.db.connection.commit()
-            
-        except Exception as e:
-            logger.error(f"Error adding performance metric: {e}")
+        self._buffer('performance_metrics', (session_id, component, metric_name, metric_value, unit))
     
     def get_session_analytics(self, session_id: str) -> Dict:
         """Get analytics for a specific session."""
         try:
-            cursor = self.db.connection.cursor()
-            
-            # Session info
-            cursor.execute("SELECT * FROM sessions WHERE id = ?", (session_id,))
-            session = cursor.fetchone()
+            self.flush()  # include events still in the buffer
+        except Exception as e:
+            logger.error(f"Error flushing analytics events: {e}")
+        try:
+            with self.db.read() as conn:
+                row = conn.execute(_SESSION_ANALYTICS_SQL, {'session_id': session_id}).fetchone()
             
-            if not session:
+            if not row:
                 return {}
             
-            # Conversation count
-            cursor.execute("SELECT COUNT(*) as count FROM conversations WHERE session_id = ?", (session_id,))
-            conv_count = cursor.fetchone()['count']
-            
-            # Face events
-            cursor.execute("SELECT * FROM face_events WHERE session_id = ? ORDER BY timestamp", (session_id,))
-            face_events = [dict(row) for row in cursor.fetchall()]
-            
-            # Audio events
-            cursor.execute("SELECT * FROM audio_events WHERE session_id = ? ORDER BY timestamp", (session_id,))
-            audio_events = [dict(row) for row in cursor.fetchall()]
-            
-            # Performance metrics
-            cursor.execute("SELECT * FROM performance_metrics WHERE session_id = ? ORDER BY timestamp", (session_id,))
-            performance_metrics = [dict(row) for row in cursor.fetchall()]
+            session = dict(row)
+            conv_count = session.pop('conversation_count')
+            face_events = json.loads(session.pop('face_events'))
+            audio_events = json.loads(session.pop('audio_events'))
+            performance_metrics = json.loads(session.pop('performance_metrics'))
             
             return {
-                'session': dict(session),
+                'session': session,
                 'conversation_count': conv_count,
                 'face_events': face_events,
                 'audio_events': audio_events,
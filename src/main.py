@@ -1,19 +1,84 @@
 import asyncio
+import json
 import sys
+import time
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 import uvicorn
 
 from utils.config import load_config
 from utils.logging import setup_logging
 from services.audio_recorder import record_user_voice
 from services.component_manager import ComponentManager
+from database.models import AsyncDBWriter, DatabaseManager, SessionModel
 
 # Setup logging
 logger = setup_logging()
 
+# Conversation log: rows are queued by the endpoints and written in batches
+CONVERSATION_BATCH_MAX = 256
+CONVERSATION_FLUSH_INTERVAL = 0.05  # seconds between batches
+
+
+async def _drain_conversations(queue: asyncio.Queue, session_model: SessionModel, writer: AsyncDBWriter):
+    """Write queued conversation rows, one transaction per batch, on the DB writer thread."""
+    while True:
+        batch = [await queue.get()]
+        while len(batch) < CONVERSATION_BATCH_MAX and not queue.empty():
+            batch.append(queue.get_nowait())
+        try:
+            await writer.run(session_model.add_conversations_bulk, batch)
+        except Exception as e:
+            logger.error(f"Failed to write {len(batch)} conversations: {e}")
+        await asyncio.sleep(CONVERSATION_FLUSH_INTERVAL)
+
+
+def _log_conversation(app: FastAPI, session_id, user_input: str, response: str, started: float):
+    """Queue a conversation row for the background writer (no-op when logging is off)."""
+    queue = getattr(app.state, "convo_queue", None)
+    if queue is None:
+        return
+    model_used = app.state.components.config.get('models', {}).get('llm_model')
+    elapsed_ms = int((time.perf_counter() - started) * 1000)
+    queue.put_nowait((session_id, user_input, response, elapsed_ms, model_used, None))
+
+
+async def _start_conversation_log(app: FastAPI, config):
+    session_config = config.get('session', {})
+    app.state.convo_queue = None
+    if not session_config.get('log_conversations', False):
+        return
+    db = DatabaseManager(session_config.get('database_path', 'data/koisk.db'))
+    writer = AsyncDBWriter(db)
+    await writer.run(db.connect)
+    await writer.run(db.initialize_schema)
+    app.state.db = db
+    app.state.db_writer = writer
+    app.state.session_model = SessionModel(db)
+    app.state.convo_queue = asyncio.Queue()
+    app.state.convo_task = asyncio.create_task(
+        _drain_conversations(app.state.convo_queue, app.state.session_model, writer)
+    )
+
+
+async def _stop_conversation_log(app: FastAPI):
+    queue = getattr(app.state, "convo_queue", None)
+    if queue is None:
+        return
+    app.state.convo_task.cancel()
+    remaining = []
+    while not queue.empty():
+        remaining.append(queue.get_nowait())
+    writer = app.state.db_writer
+    try:
+        await writer.run(app.state.session_model.add_conversations_bulk, remaining)
+    except Exception as e:
+        logger.error(f"Failed to write {len(remaining)} conversations on shutdown: {e}")
+    await writer.run(app.state.db.disconnect)
+    writer.shutdown()
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -26,6 +91,7 @@ async def lifespan(app: FastAPI):
         config = load_config()
         app.state.components = ComponentManager(config)
         await app.state.components.initialize_all()
+        await _start_conversation_log(app, config)
         logger.info("All components initialized successfully!")
     except Exception as e:
         logger.error(f"Failed to initialize components: {e}")
@@ -36,6 +102,7 @@ async def lifespan(app: FastAPI):
         yield # App runs here
     finally:
         logger.info("Shutting down Koisk LLM system...")
+        await _stop_conversation_log(app)
         comps = getattr(app.state, "components", None)
         if comps:
             await comps.cleanup_all()
@@ -73,6 +140,7 @@ async def health_check():
 @app.post("/interact")
 async def interact(text: str = None):
     """Main interaction endpoint."""
+    started = time.perf_counter()
     try:
         comps = getattr(app.state, "components", None)
         if not comps or not getattr(comps, "session_manager", None):
@@ -99,6 +167,7 @@ async def interact(text: str = None):
         
         # pass input to session manager for processing
         response = await comps.session_manager.process_interaction(user_input)
+        _log_conversation(app, comps.session_manager.current_session_id, user_input, response, started)
 
         return {
             "user_input": user_input,
@@ -111,6 +180,37 @@ async def interact(text: str = None):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/interact/stream")
+async def interact_stream(text: str):
+    """Text interaction that streams the answer as server-sent events."""
+    comps = getattr(app.state, "components", None)
+    if not comps or not getattr(comps, "llm", None):
+        raise HTTPException(status_code=503, detail="LLM not initialized")
+    user_input = text.strip()
+    if not user_input:
+        raise HTTPException(status_code=400, detail="Empty input")
+
+    async def events():
+        started = time.perf_counter()
+        chunks = []
+        try:
+            async for token in comps.llm.stream_response(user_input):
+                chunks.append(token)
+                yield f"data: {json.dumps({'text': token})}\n\n"
+        except Exception as e:
+            logger.error(f"Error in streaming interaction: {e}")
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+            return
+        session_manager = getattr(comps, "session_manager", None)
+        if session_manager and chunks:
+            response = "".join(chunks).strip()
+            await session_manager.add_to_history(user_input, response)
+            _log_conversation(app, session_manager.current_session_id, user_input, response, started)
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
 async def main():
     """Main application entry point."""
     
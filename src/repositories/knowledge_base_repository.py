@@ -2,14 +2,20 @@
 
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
+import os
 from datetime import UTC, datetime
+from functools import lru_cache
 from typing import Any, Dict, List, Optional
 from uuid import UUID, uuid4
 
 import asyncpg
+import numpy as np
 from asyncpg import Connection
+from pgvector import HalfVector
+from pgvector.asyncpg import register_vector
 
 from services.settings import get_settings
 from schemas.knowledge_base import (
@@ -21,6 +27,13 @@ from schemas.knowledge_base import (
 
 logger = logging.getLogger(__name__)
 
+# (max documents, m, ef_construction, ef_search): larger corpora need a denser graph for the same recall
+_HNSW_PROFILES = (
+    (100_000, 16, 64, 40),
+    (1_000_000, 24, 100, 100),
+    (None, 32, 128, 200),
+)
+
 
 class KnowledgeBaseRepository:
     """Repository for managing knowledge base documents in PostgreSQL with pgvector."""
@@ -29,6 +42,7 @@ class KnowledgeBaseRepository:
         """Initialize the knowledge base repository."""
         self.settings = get_settings()
         self._connection_pool: Optional[asyncpg.Pool] = None
+        self._hnsw_ef_search: Optional[int] = None
 
     async def initialize(self) -> None:
         """Initialize the database connection pool and create tables if needed."""
@@ -36,7 +50,8 @@ class KnowledgeBaseRepository:
             self._connection_pool = await asyncpg.create_pool(
                 self.settings.VECTOR_DB_URL,
                 min_size=1,
-                max_size=10
+                max_size=10,
+                init=self._init_connection
             )
             
             # Create tables and indexes
@@ -47,6 +62,49 @@ class KnowledgeBaseRepository:
             logger.error(f"Failed to initialize knowledge base repository: {e}")
             raise
 
+    @staticmethod
+    async def _init_connection(conn: Connection) -> None:
+        """Install the binary pgvector codec so vectors arrive as float32 ndarrays."""
+        await conn.execute("CREATE EXTENSION IF NOT EXISTS vector;")
+        await register_vector(conn)
+
+    def _hnsw_params(self, total_documents: int) -> tuple[int, int, int]:
+        """Return (m, ef_construction, ef_search), explicit settings overriding the size profile."""
+        for max_docs, m, ef_construction, ef_search in _HNSW_PROFILES:
+            if max_docs is None or total_documents < max_docs:
+                break
+        return (
+            self.settings.HNSW_M or m,
+            self.settings.HNSW_EF_CONSTRUCTION or ef_construction,
+            self.settings.HNSW_EF_SEARCH or ef_search,
+        )
+
+    @staticmethod
+    async def _built_hnsw_params(conn: Connection) -> Optional[tuple[int, int]]:
+        """Return the (m, ef_construction) the HNSW index was built with, or None if it doesn't exist."""
+        row = await conn.fetchrow("""
+            SELECT reloptions FROM pg_class
+            WHERE oid = to_regclass('knowledge_documents_embedding_hnsw')
+        """)
+        if row is None:
+            return None
+        options = dict(option.split("=", 1) for option in row["reloptions"] or ())
+        # pgvector's defaults apply when the index was created without WITH (...)
+        return int(options.get("m", 16)), int(options.get("ef_construction", 64))
+
+    @staticmethod
+    def _embedding_array(embedding: Any) -> Optional[np.ndarray]:
+        """Return a decoded vector/halfvec column as a float32 ndarray."""
+        if isinstance(embedding, HalfVector):
+            return embedding.to_numpy().astype(np.float32)
+        return embedding
+
+    @classmethod
+    def _embedding_list(cls, embedding: Any) -> List[float]:
+        """Convert a decoded vector to the plain list the Pydantic schema expects."""
+        embedding = cls._embedding_array(embedding)
+        return embedding.tolist() if embedding is not None else []
+
     async def close(self) -> None:
         """Close the database connection pool."""
         if self._connection_pool:
@@ -61,17 +119,14 @@ class KnowledgeBaseRepository:
         if not self._connection_pool:
             await self.initialize()
             
-        async with self._connection_pool.acquire() as conn:
-            try:
-                count = await conn.fetchval("""
-                    SELECT COUNT(*) > 0 
-                    FROM knowledge_documents
-                    LIMIT 1
-                """)
-                return bool(count)
-            except Exception as e:
-                logger.error(f"Error checking for documents: {str(e)}")
-                return False
+        try:
+            exists = await self._connection_pool.fetchval("""
+                SELECT EXISTS (SELECT 1 FROM knowledge_documents)
+            """)
+            return bool(exists)
+        except Exception as e:
+            logger.error(f"Error checking for documents: {str(e)}")
+            return False
 
     async def _create_tables(self) -> None:
         """Create the necessary tables and indexes for the knowledge base."""
@@ -79,32 +134,61 @@ class KnowledgeBaseRepository:
             # Enable pgvector extension
             await conn.execute("CREATE EXTENSION IF NOT EXISTS vector;")
             
-            # Create documents table
+            # Create documents table; halfvec stores FP16, halving row size and index memory
             vector_dim = self.settings.VECTOR_DIMENSIONS
+            vector_type = "halfvec" if self.settings.USE_HALFVEC else "vector"
             await conn.execute(f"""
                 CREATE TABLE IF NOT EXISTS knowledge_documents (
                     id UUID PRIMARY KEY,
                     content TEXT NOT NULL,
                     metadata JSONB NOT NULL,
-                    embedding vector({vector_dim}) NOT NULL,
+                    embedding {vector_type}({vector_dim}) NOT NULL,
                     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
                     updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
                 );
             """)
             
+            column_type = await conn.fetchval("""
+                SELECT format_type(atttypid, atttypmod) FROM pg_attribute
+                WHERE attrelid = 'knowledge_documents'::regclass AND attname = 'embedding'
+            """)
+            if column_type != f"{vector_type}({vector_dim})":
+                logger.warning(
+                    f"knowledge_documents.embedding is {column_type}, settings expect {vector_type}({vector_dim}); "
+                    f"migrate the column (and drop its index) before changing USE_HALFVEC"
+                )
+                vector_type = column_type.split("(")[0]
+            
             # Create indexes for better performance
             if self.settings.USE_IVFFLAT:
                 cluster_count = self.settings.IVFFLAT_CLUSTER_COUNT
                 await conn.execute(f"""
                     CREATE INDEX IF NOT EXISTS knowledge_documents_embedding_ivfflat
-                        ON knowledge_documents USING ivfflat (embedding vector_cosine_ops)
+                        ON knowledge_documents USING ivfflat (embedding {vector_type}_cosine_ops)
                         WITH (lists = {cluster_count});
                 """)
             else:
-                await conn.execute("""
+                total_docs = await conn.fetchval("SELECT COUNT(*) FROM knowledge_documents")
+                m, ef_construction, self._hnsw_ef_search = self._hnsw_params(total_docs)
+                built = await self._built_hnsw_params(conn)
+                if built is not None and built != (m, ef_construction):
+                    # Corpus moved to another size profile (or the settings changed): rebuild so
+                    # the graph on disk matches the ef_search chosen above
+                    logger.info(
+                        f"Rebuilding HNSW index for {total_docs} documents: "
+                        f"m={built[0]}->{m}, ef_construction={built[1]}->{ef_construction}"
+                    )
+                    await conn.execute("DROP INDEX knowledge_documents_embedding_hnsw")
+                # Only affects this session; a build that spills out of memory is many times slower
+                await conn.execute(f"SET maintenance_work_mem = '{self.settings.HNSW_MAINTENANCE_WORK_MEM}'")
+                await conn.execute(f"SET max_parallel_maintenance_workers = {min(7, max(1, (os.cpu_count() or 2) - 1))}")
+                await conn.execute(f"""
                     CREATE INDEX IF NOT EXISTS knowledge_documents_embedding_hnsw
-                        ON knowledge_documents USING hnsw (embedding vector_cosine_ops);
+                        ON knowledge_documents USING hnsw (embedding {vector_type}_cosine_ops)
+                        WITH (m = {m}, ef_construction = {ef_construction});
                 """)
+                await conn.execute("RESET maintenance_work_mem")
+                await conn.execute("RESET max_parallel_maintenance_workers")
             
             await conn.execute("""
                 CREATE INDEX IF NOT EXISTS knowledge_documents_metadata_gin
@@ -142,18 +226,15 @@ class KnowledgeBaseRepository:
             # Convert metadata to dict and ensure all values are JSON serializable
             metadata_dump = metadata.model_dump()
         
-            # Convert the embedding list to a string format for pgvector
-            embedding_str = '[' + ','.join(map(str, embedding)) + ']'
-        
             async with self._connection_pool.acquire() as conn:
                 await conn.execute("""
                     INSERT INTO knowledge_documents (id, content, metadata, embedding, created_at, updated_at)
-                    VALUES ($1, $2, $3::jsonb, $4::vector, $5, $6)
+                    VALUES ($1, $2, $3::jsonb, $4, $5, $6)
                 """, 
                     document_id, 
                     content, 
                     json.dumps(metadata_dump),
-                    embedding_str,
+                    np.asarray(embedding, dtype=np.float32),
                     now, 
                     now
                 )
@@ -176,6 +257,36 @@ class KnowledgeBaseRepository:
             logger.error(f"Metadata: {metadata.model_dump()}")
             raise
 
+    async def create_documents_bulk(
+        self,
+        items: List[tuple[str, DocumentMetadata, List[float]]]
+    ) -> int:
+        """Insert many (content, metadata, embedding) documents with one binary COPY."""
+        if not items:
+            return 0
+        now = datetime.now(UTC)
+        records = [
+            (
+                uuid4(),
+                content,
+                json.dumps(metadata.model_dump()),
+                np.asarray(embedding, dtype=np.float32),
+                now,
+                now
+            )
+            for content, metadata, embedding in items
+        ]
+        
+        async with self._connection_pool.acquire() as conn:
+            await conn.copy_records_to_table(
+                'knowledge_documents',
+                records=records,
+                columns=['id', 'content', 'metadata', 'embedding', 'created_at', 'updated_at']
+            )
+        
+        logger.info(f"Bulk inserted {len(records)} documents")
+        return len(records)
+
     async def get_document(self, document_id: UUID) -> Optional[KnowledgeDocument]:
         """Get a document by ID."""
         async with self._connection_pool.acquire() as conn:
@@ -188,13 +299,7 @@ class KnowledgeBaseRepository:
             if not row:
                 return None
             
-            # Handle embedding conversion
-            embedding = None
-            if row['embedding'] is not None:
-                if isinstance(row['embedding'], (list, tuple)):
-                    embedding = [float(x) for x in row['embedding']]
-                elif hasattr(row['embedding'], 'to_list'):  # Handle pgvector vector type
-                    embedding = row['embedding'].to_list()
+            embedding = self._embedding_list(row['embedding'])
             
             # Handle metadata conversion
             metadata = row['metadata']
@@ -214,68 +319,98 @@ class KnowledgeBaseRepository:
                 updated_at=row['updated_at']
             )
 
+    async def _filter_is_selective(self, conn: Connection, filter_json: str) -> bool:
+        """Whether a metadata filter matches under FILTER_EXACT_SCAN_SELECTIVITY of the table.
+
+        Counts at most that many matches, so the check stays cheap for broad filters.
+        """
+        return await conn.fetchval("""
+            WITH total AS (
+                SELECT GREATEST(reltuples, 0) AS n FROM pg_class
+                WHERE oid = 'knowledge_documents'::regclass
+            )
+            SELECT COUNT(*) < (SELECT n * $2::float FROM total)
+            FROM (
+                SELECT 1 FROM knowledge_documents
+                WHERE metadata @> $1::jsonb
+                LIMIT (SELECT CEIL(n * $2::float)::bigint FROM total)
+            ) matches
+        """, filter_json, self.settings.FILTER_EXACT_SCAN_SELECTIVITY)
+
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def _search_sql(has_filter: bool, has_threshold: bool) -> str:
+        """Build the search SQL once per filter shape.
+
+        The text is stable for a given shape, so asyncpg's per-connection statement
+        cache reuses the server-side prepared statement instead of re-parsing/planning.
+        """
+        where_clause = ""
+        param_count = 2
+        if has_filter:
+            # One containment predicate, served by the gin (metadata) index for any key
+            param_count += 1
+            where_clause += f" AND metadata @> ${param_count}::jsonb"
+        if has_threshold:
+            param_count += 1
+            where_clause += f" AND 1 - (embedding <=> $1) > ${param_count}::float"
+        
+        # No window function here: ranking every match would force a full sort
+        # and stop the ivfflat/hnsw index scan from short-circuiting at LIMIT
+        return f"""
+            SELECT id, content, metadata, embedding, created_at, updated_at,
+                   1 - (embedding <=> $1) as similarity_score
+            FROM knowledge_documents
+            WHERE 1=1 {where_clause}
+            ORDER BY embedding <=> $1
+            LIMIT $2::int
+        """
+
     async def search_similar_documents(
         self,
-        query_embedding: List[float],
+        query_embedding: List[float] | np.ndarray,
         k: int = 5,
         filter_metadata: Optional[Dict[str, Any]] = None,
         similarity_threshold: Optional[float] = None
     ) -> List[VectorSearchResult]:
         """Search for similar documents using vector similarity."""
         async with self._connection_pool.acquire() as conn:
-            # String representation of the vector
-            embedding_str = '[' + ','.join(f"{float(x):.18f}" for x in query_embedding) + ']'
-            
-            # Build the query with optional filters
-            where_clause = ""
-            params = [embedding_str, k]
-            param_count = 2
+            # Sent as raw float32 through the binary codec, no text formatting/parsing
+            query_vector = np.asarray(query_embedding, dtype=np.float32)
             
+            query = self._search_sql(bool(filter_metadata), similarity_threshold is not None)
+            params = [query_vector, k]
             if filter_metadata:
-                for key, value in filter_metadata.items():
-                    param_count += 1
-                    # Use proper JSONB operator and parameter
-                    where_clause += f" AND metadata->>'{key}' = ${param_count}::text"
-                    params.append(str(value))
-            
+                params.append(json.dumps({key: str(value) for key, value in filter_metadata.items()}))
             if similarity_threshold is not None:
-                param_count += 1
-                where_clause += f" AND 1 - (embedding <=> $1::vector) > ${param_count}::float"
                 params.append(float(similarity_threshold))
             
-            query = f"""
-                SELECT id, content, metadata, embedding, created_at, updated_at,
-                       1 - (embedding <=> $1::vector) as similarity_score,
-                       ROW_NUMBER() OVER (ORDER BY embedding <=> $1::vector) as rank
-                FROM knowledge_documents
-                WHERE 1=1 {where_clause}
-                ORDER BY embedding <=> $1::vector
-                LIMIT $2::int
-            """
-            
             logger.debug(f"Executing vector search with query: {query}")
-            logger.debug(f"Parameters: {params}")
+            logger.debug(f"Parameters: {params[1:]}")
             
-            rows = await conn.fetch(query, *params)
+            session_settings = []
+            if filter_metadata and await self._filter_is_selective(conn, params[2]):
+                # Few rows match: filter first via the GIN bitmap scan and rank that subset exactly,
+                # rather than walking the ANN index past mostly filtered-out neighbours
+                session_settings.append("SET LOCAL enable_indexscan = off")
+                # The search text is a reused prepared statement; a cached generic plan would
+                # keep its index scan and ignore enable_indexscan, so re-plan this execution
+                session_settings.append("SET LOCAL plan_cache_mode = force_custom_plan")
+            elif self._hnsw_ef_search is not None:
+                # ef_search below k would cap the result count, not just recall
+                session_settings.append(f"SET LOCAL hnsw.ef_search = {max(self._hnsw_ef_search, k)}")
+            
+            if session_settings:
+                async with conn.transaction():
+                    for statement in session_settings:
+                        await conn.execute(statement)
+                    rows = await conn.fetch(query, *params)
+            else:
+                rows = await conn.fetch(query, *params)
             
             results = []
-            for row in rows:
-                # Handle embedding conversion - ensure we always return a list
-                embedding = []
-                if row['embedding'] is not None:
-                    try:
-                        # Handles case when already stored as list:
-                        if isinstance(row['embedding'], (list, tuple)):
-                            embedding = [float(x) for x in row['embedding']]
-                        # Handles pgvector type:
-                        elif hasattr(row['embedding'], 'to_list'):
-                            embedding = row['embedding'].to_list()
-                        # Handle string representation:
-                        elif isinstance(row['embedding'], str):  
-                            embedding = [float(x) for x in row['embedding'].strip('[]').split(',') if x.strip()]
-                    except (ValueError, TypeError) as e:
-                        logger.warning(f"Error converting embedding: {e}")
-                        embedding = []
+            for rank, row in enumerate(rows, 1):
+                embedding = self._embedding_list(row['embedding'])
                 
                 # Ensure metadata is a dictionary
                 metadata = row['metadata']
@@ -306,11 +441,37 @@ class KnowledgeBaseRepository:
                 results.append(VectorSearchResult(
                     document=document,
                     similarity_score=float(row['similarity_score']),
-                    rank=int(row['rank'])
+                    rank=rank
                 ))
             
             return results
 
+    async def get_all_embeddings(self) -> List[Dict[str, Any]]:
+        """Fetch id, content, metadata and embedding for every document (for in-process indexes)."""
+        async with self._connection_pool.acquire() as conn:
+            rows = await conn.fetch("""
+                SELECT id, content, metadata, embedding
+                FROM knowledge_documents
+                WHERE embedding IS NOT NULL
+            """)
+        
+        documents = []
+        for row in rows:
+            metadata = row['metadata']
+            if isinstance(metadata, str):
+                try:
+                    metadata = json.loads(metadata)
+                except json.JSONDecodeError:
+                    logger.warning(f"Failed to parse metadata JSON for document {row['id']}")
+                    metadata = {}
+            documents.append({
+                'id': row['id'],
+                'content': row['content'],
+                'metadata': metadata,
+                'embedding': self._embedding_array(row['embedding']),
+            })
+        return documents
+
     async def get_documents_by_source(self, source: str) -> List[KnowledgeDocument]:
         """Get all documents from a specific source."""
         async with self._connection_pool.acquire() as conn:
@@ -323,21 +484,7 @@ class KnowledgeBaseRepository:
             
             documents = []
             for row in rows:
-                embedding = []
-                if row['embedding'] is not None:
-                    try:
-                        # Handles case when already stored as list:
-                        if isinstance(row['embedding'], (list, tuple)):
-                            embedding = [float(x) for x in row['embedding']]
-                        # Handles pgvector type:
-                        elif hasattr(row['embedding'], 'to_list'):
-                            embedding = row['embedding'].to_list()
-                        # Handle string representation:
-                        elif isinstance(row['embedding'], str):  
-                            embedding = [float(x) for x in row['embedding'].strip('[]').split(',') if x.strip()]
-                    except (ValueError, TypeError) as e:
-                        logger.warning(f"Error converting embedding: {e}")
-                        embedding = []
+                embedding = self._embedding_list(row['embedding'])
                 
                 # Ensure metadata is a dictionary
                 metadata = row['metadata']
@@ -371,56 +518,54 @@ class KnowledgeBaseRepository:
 
     async def delete_documents_by_source(self, source: str) -> int:
         """Delete all documents from a specific source."""
-        async with self._connection_pool.acquire() as conn:
-            result = await conn.execute("""
-                DELETE FROM knowledge_documents
-                WHERE metadata->>'source' = $1
-            """, source)
-            
-            return int(result.split()[-1])
+        result = await self._connection_pool.execute("""
+            DELETE FROM knowledge_documents
+            WHERE metadata->>'source' = $1
+        """, source)
+        
+        return int(result.split()[-1])
 
     async def get_knowledge_base_stats(self) -> KnowledgeBaseStats:
         """Get statistics about the knowledge base."""
-        async with self._connection_pool.acquire() as conn:
-            total_docs = await conn.fetchval("SELECT COUNT(*) FROM knowledge_documents")
-            
-            unique_sources = await conn.fetchval("""
-                SELECT COUNT(DISTINCT metadata->>'source') 
+        pool = self._connection_pool
+        # Independent queries on separate pooled connections; the aggregates share one scan
+        totals, frameworks, categories = await asyncio.gather(
+            pool.fetchrow("""
+                SELECT COUNT(*) AS total_docs,
+                       COUNT(DISTINCT metadata->>'source') AS unique_sources,
+                       MAX(updated_at) AS last_updated
                 FROM knowledge_documents
-            """)
-            
-            frameworks = await conn.fetch("""
+            """),
+            pool.fetch("""
                 SELECT DISTINCT metadata->>'framework' as framework
                 FROM knowledge_documents
                 WHERE metadata->>'framework' IS NOT NULL
-            """)
-            
-            categories = await conn.fetch("""
+            """),
+            pool.fetch("""
                 SELECT DISTINCT metadata->>'category' as category
                 FROM knowledge_documents
                 WHERE metadata->>'category' IS NOT NULL
-            """)
-
-            last_updated = await conn.fetchval("""
-                SELECT MAX(updated_at) FROM knowledge_documents
-            """)
-            
-            return KnowledgeBaseStats(
-                total_documents=total_docs,
-                total_chunks=total_docs,
-                unique_sources=unique_sources,
-                frameworks=[row['framework'] for row in frameworks],
-                categories=[row['category'] for row in categories],
-                last_updated=last_updated or datetime.now(UTC),
-                embedding_model=self.settings.EMBEDDING_MODEL,
-                vector_dimensions=self.settings.VECTOR_DIMENSIONS
-            )
+            """),
+        )
+        total_docs = totals['total_docs']
+        unique_sources = totals['unique_sources']
+        last_updated = totals['last_updated']
+        
+        return KnowledgeBaseStats(
+            total_documents=total_docs,
+            total_chunks=total_docs,
+            unique_sources=unique_sources,
+            frameworks=[row['framework'] for row in frameworks],
+            categories=[row['category'] for row in categories],
+            last_updated=last_updated or datetime.now(UTC),
+            embedding_model=self.settings.EMBEDDING_MODEL,
+            vector_dimensions=self.settings.VECTOR_DIMENSIONS
+        )
 
     async def health_check(self) -> bool:
         """Check if the repository is healthy."""
         try:
-            async with self._connection_pool.acquire() as conn:
-                await conn.fetchval("SELECT 1")
+            await self._connection_pool.fetchval("SELECT 1")
             return True
         except Exception as e:
             logger.error(f"Knowledge base repository health check failed: {e}")
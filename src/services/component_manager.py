@@ -1,3 +1,5 @@
+import asyncio
+
 from components.face_detection import FaceDetector
 from components.asr import ASRComponent
 from components.llm_inference import LLMComponent
@@ -24,12 +26,15 @@ class ComponentManager:
         self.session_manager = SessionManager(config)
 
     async def initialize_all(self):
-        await self.asr.initialize()
-        await self.rag.initialize()
-        await self.reranker.initialize()
+        # Independent components load concurrently; the LLM depends on RAG + reranker
+        await asyncio.gather(
+            self.asr.initialize(),
+            self.rag.initialize(),
+            self.reranker.initialize(),
+            self.tts.initialize(),
+            self.session_manager.initialize(),
+        )
         await self.llm.initialize()
-        await self.tts.initialize()
-        await self.session_manager.initialize()
 
     async def cleanup_all(self):
         await self.session_manager.cleanup()
@@ -377,7 +377,11 @@ class KnowledgeBaseScraper:
                 
             # Split content into chunks
             try:
-                chunks = self.text_splitter.split_text(content)
+                # Content that already fits in one chunk skips the splitter's overlap/boundary work
+                if len(content) <= self.settings.CHUNK_SIZE:
+                    chunks = [content.strip()] if content.strip() else []
+                else:
+                    chunks = self.text_splitter.split_text(content)
                 if not chunks:
                     logger.warning(f"Could not split content into chunks for {url}")
                     return 0
@@ -388,7 +392,13 @@ class KnowledgeBaseScraper:
 
             # Generate embeddings
             try:
-                embeddings = self.embedding_model.encode(chunks).tolist()
+                # One batched forward pass per page instead of per-chunk calls
+                embeddings = self.embedding_model.encode(
+                    chunks,
+                    batch_size=64,
+                    show_progress_bar=False,
+                    convert_to_numpy=True
+                ).tolist()
                 if not embeddings or len(embeddings) != len(chunks):
                     logger.error(f"Failed to generate embeddings for {url}")
                     return 0
@@ -425,8 +435,8 @@ class KnowledgeBaseScraper:
                 logger.error(f"Error preparing metadata for {url}: {str(e)}", exc_info=True)
                 return 0
             
-            # Ingest each chunk into PostgreSQL
-            chunks_ingested = 0
+            # Prepare every chunk, then ingest the page into PostgreSQL with one COPY
+            items = []
             for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
                 try:
                     # Create a clean metadata dictionary with only the expected fields
@@ -461,18 +471,18 @@ class KnowledgeBaseScraper:
                     # Log the embedding dimensions for debugging
                     logger.debug(f"Embedding dimensions for chunk {i}: {len(embedding) if embedding else 0}")
                     
-                    await self.repository.create_document(
-                        content=chunk,
-                        metadata=doc_metadata,
-                        embedding=embedding
-                    )
-                    chunks_ingested += 1
-                    logger.debug(f"Successfully ingested chunk {i} from {url}")
+                    items.append((chunk, doc_metadata, embedding))
                     
                 except Exception as e:
-                    logger.error(f"Error ingesting chunk {i} from {url}: {str(e)}", exc_info=True)
+                    logger.error(f"Error preparing chunk {i} from {url}: {str(e)}", exc_info=True)
                     continue  # Try to continue with remaining chunks
             
+            try:
+                chunks_ingested = await self.repository.create_documents_bulk(items)
+            except Exception as e:
+                logger.error(f"Error ingesting chunks from {url}: {str(e)}", exc_info=True)
+                chunks_ingested = 0
+            
             if chunks_ingested > 0:
                 logger.info(f"Successfully ingested {chunks_ingested}/{len(chunks)} chunks from {url} into PostgreSQL")
             else:
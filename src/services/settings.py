@@ -9,6 +9,7 @@ Uses:
 
 from __future__ import annotations
 from functools import lru_cache
+from typing import Optional
 from pydantic import Field
 from pydantic_settings import BaseSettings
 
@@ -122,6 +123,11 @@ Please give a short succinct context to situate this chunk within the overall do
         description="PostgreSQL database URL with pgvector enabled.",
     )
 
+    USE_HALFVEC: bool = Field(
+        default=False,
+        description="Store embeddings as FP16 halfvec (half the disk/index memory, negligible recall loss).",
+    )
+
     USE_IVFFLAT: bool = Field(
         default=True,
         description="Enable IVF_FLAT ANN indexing using pgvector.",
@@ -132,6 +138,31 @@ Please give a short succinct context to situate this chunk within the overall do
         description="Number of IVF clusters (increase for large corpora).",
     )
 
+    HNSW_M: Optional[int] = Field(
+        default=None,
+        description="HNSW graph degree (None = pick from corpus size at startup; the index is rebuilt when it changes).",
+    )
+
+    HNSW_EF_CONSTRUCTION: Optional[int] = Field(
+        default=None,
+        description="HNSW build-time candidate list size (None = pick from corpus size at startup; the index is rebuilt when it changes).",
+    )
+
+    HNSW_EF_SEARCH: Optional[int] = Field(
+        default=None,
+        description="HNSW query-time candidate list size (None = pick from corpus size).",
+    )
+
+    HNSW_MAINTENANCE_WORK_MEM: str = Field(
+        default="512MB",
+        description="maintenance_work_mem for HNSW builds; keep the graph in memory while building.",
+    )
+
+    FILTER_EXACT_SCAN_SELECTIVITY: float = Field(
+        default=0.01,
+        description="Filtered searches matching less than this fraction of rows skip the ANN index and scan exactly.",
+    )
+
     RAG_ENABLED: bool = Field(
         default=True,
         description="Enable RAG: vector search + context injection into TinyLlama.",
@@ -47,6 +47,7 @@ def get_default_config() -> Dict[str, Any]:
         },
         "models": {
             "whisper_model": "base",
+            "whisper_precision": "int8",
             "llm_model": "tinyllama-1.1b-chat-v1.0.Q4_K_M.gguf",
             "tts_voice": "en_US-ljspeech-medium",
             "embedding_model": "all-MiniLM-L6-v2"
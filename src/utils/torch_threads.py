@@ -0,0 +1,41 @@
+"""
+Process-wide thread configuration for PyTorch CPU inference.
+"""
+
+import logging
+import os
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+_configured = False
+
+
+def configure_torch_threads(num_threads: Optional[int] = None):
+    """
+    Pin torch/MKL/OpenMP intra-op threads once per process.
+
+    Defaults to the physical core count (half the logical CPUs) so the embedder and
+    reranker don't oversubscribe hyperthreads. Later calls are no-ops.
+
+    Args:
+        num_threads: Thread count; None or 0 for physical cores
+    """
+    global _configured
+    if _configured:
+        return
+    _configured = True
+
+    n = num_threads or max(1, (os.cpu_count() or 2) // 2)
+    os.environ.setdefault("MKL_NUM_THREADS", str(n))
+    os.environ.setdefault("OMP_NUM_THREADS", str(n))
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(n)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass  # can only be set before the first parallel op
+    logger.info(f"Torch intra-op threads: {torch.get_num_threads()}")
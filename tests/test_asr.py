@@ -0,0 +1,67 @@
+"""
+Unit tests for ASRComponent audio preparation, using a stand-in faster_whisper model.
+"""
+
+import asyncio
+import sys
+import types
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+
+class FakeWhisperModel:
+    """Records what it was asked to transcribe."""
+
+    def __init__(self, *args, **kwargs):
+        self.inputs = []
+
+    def transcribe(self, audio):
+        self.inputs.append(audio if isinstance(audio, str) else np.array(audio))
+        return iter([types.SimpleNamespace(text=" hello"), types.SimpleNamespace(text=" world ")]), None
+
+
+@pytest.fixture
+def asr(monkeypatch):
+    monkeypatch.setitem(sys.modules, "faster_whisper", types.SimpleNamespace(WhisperModel=FakeWhisperModel))
+    sys.modules.pop("components.asr", None)
+    from components.asr import ASRComponent
+
+    component = ASRComponent({})
+    asyncio.run(component.initialize())
+    component.model = FakeWhisperModel()
+    return component
+
+
+def test_int16_pcm_is_scaled_to_unit_range(asr):
+    pcm = np.array([0, 16384, -32767, 32767], dtype=np.int16)
+
+    audio = asr._prepare_audio(pcm, 16000)
+    assert audio.dtype == np.float32
+    np.testing.assert_allclose(audio, pcm / 32767.0, rtol=1e-6)
+
+
+def test_int16_stereo_is_downmixed_and_scaled(asr):
+    pcm = np.array([[32767, 0], [-32767, -32767]], dtype=np.int16)
+
+    audio = asr._prepare_audio(pcm, 16000)
+    np.testing.assert_allclose(audio, [0.5, -1.0], rtol=1e-6)
+
+
+def test_float32_mono_passes_through(asr):
+    samples = np.linspace(-1, 1, 100, dtype=np.float32)
+
+    assert asr._prepare_audio(samples, 16000) is samples
+
+
+def test_buffer_and_file_share_one_transcribe_path(asr):
+    text = asyncio.run(asr.transcribe_audio(np.full(160, 3276, dtype=np.int16)))
+    assert text == "hello world"
+    assert asr.model.inputs[0].max() <= 1.0
+
+    assert asyncio.run(asr.transcribe_file("clip.wav")) == "hello world"
+    assert asr.model.inputs[1] == "clip.wav"
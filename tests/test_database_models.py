@@ -0,0 +1,240 @@
+"""
+Unit tests for the SQLite database models (temporary database per test).
+"""
+
+import asyncio
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from database import models
+from database.models import AnalyticsModel, AsyncDBWriter, DatabaseManager, DocumentModel, SessionModel
+
+
+@pytest.fixture
+def db(tmp_path):
+    manager = DatabaseManager(str(tmp_path / "koisk.db"))
+    manager.connect()
+    manager.initialize_schema()
+    SessionModel(manager).create_session("s1")
+    yield manager
+    manager.disconnect()
+
+
+@pytest.fixture
+def plain_db(tmp_path, monkeypatch):
+    """Database without sqlite-vec, so searches take the in-process paths."""
+    monkeypatch.setattr(models, "sqlite_vec", None)
+    manager = DatabaseManager(str(tmp_path / "plain.db"))
+    manager.connect()
+    manager.initialize_schema()
+    yield manager
+    manager.disconnect()
+
+
+def add_corpus(documents: DocumentModel, n: int = 40, dim: int = 8) -> np.ndarray:
+    embeddings = np.random.default_rng(0).normal(size=(n, dim)).astype(np.float32)
+    for i, embedding in enumerate(embeddings):
+        documents.add_document(f"doc {i}", f"content {i}", embedding.tolist(),
+                               category="hostel" if i % 2 else "fees", language="en")
+    return embeddings
+
+
+def expected_ranking(embeddings: np.ndarray, query: np.ndarray, mask=None) -> list:
+    normalized = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    scores = normalized @ (query / np.linalg.norm(query))
+    if mask is not None:
+        scores[~mask] = -np.inf
+    return [int(i) + 1 for i in np.argsort(-scores)]  # row ids start at 1
+
+
+def count_rows(db, table: str) -> int:
+    with db.read() as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def test_analytics_flushes_by_row_count(db):
+    analytics = AnalyticsModel(db, flush_rows=3, flush_interval=60)
+    for _ in range(3):
+        analytics.add_performance_metric("s1", "llm", "latency", 1.0, "s")
+
+    assert count_rows(db, "performance_metrics") == 3
+
+
+def test_analytics_flushes_quiet_buffer_on_timer(db):
+    analytics = AnalyticsModel(db, flush_rows=500, flush_interval=0.05)
+    analytics.add_face_event("s1", "face_detected", confidence=0.9)
+    assert count_rows(db, "face_events") == 0
+
+    deadline = time.monotonic() + 2
+    while count_rows(db, "face_events") == 0 and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert count_rows(db, "face_events") == 1
+
+
+def test_analytics_keeps_events_when_flush_fails(db):
+    analytics = AnalyticsModel(db, flush_rows=1, flush_interval=60)
+    with db.write_lock:
+        db.connection.execute("DROP TABLE audio_events")
+
+    analytics.add_audio_event("s1", "transcribed", transcription_text="hello")  # logged, not raised
+    with pytest.raises(Exception):
+        analytics.flush()
+
+    db.initialize_schema()
+    analytics.flush()
+    assert count_rows(db, "audio_events") == 1
+
+
+def test_session_analytics_include_buffered_events(db):
+    analytics = AnalyticsModel(db, flush_rows=500, flush_interval=60)
+    analytics.add_performance_metric("s1", "asr", "latency", 0.5, "s")
+
+    result = analytics.get_session_analytics("s1")
+    assert len(result["performance_metrics"]) == 1
+
+
+@pytest.mark.parametrize("has_returning", [True, False])
+def test_end_session_records_duration(db, monkeypatch, has_returning):
+    if has_returning and not models._HAS_RETURNING:
+        pytest.skip("SQLite < 3.35 has no UPDATE ... RETURNING")
+    monkeypatch.setattr(models, "_HAS_RETURNING", has_returning)
+    sessions = SessionModel(db)
+
+    assert sessions.end_session("s1")
+    assert not sessions.end_session("missing")
+    with db.read() as conn:
+        row = conn.execute("SELECT ended_at, duration_seconds FROM sessions WHERE id = 's1'").fetchone()
+    assert row["ended_at"] is not None
+    assert row["duration_seconds"] >= 0
+
+
+def test_foreign_keys_are_enforced(db):
+    with pytest.raises(Exception):
+        SessionModel(db).add_conversation("no-such-session", "hi", "hello")
+
+
+def test_analytics_events_create_missing_sessions(db):
+    analytics = AnalyticsModel(db, flush_rows=1, flush_interval=60)
+    analytics.add_face_event("kiosk-2", "face_detected")
+    analytics.add_face_event(None, "face_lost")
+
+    assert count_rows(db, "face_events") == 2
+    with db.read() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM sessions WHERE id = 'kiosk-2'").fetchone()[0] == 1
+
+
+def test_matrix_scan_matches_brute_force(plain_db):
+    documents = DocumentModel(plain_db)
+    embeddings = add_corpus(documents)
+    query = embeddings[5] + 0.1
+
+    results = documents.search_documents(query.tolist(), limit=5)
+    assert [r['id'] for r in results] == expected_ranking(embeddings, query)[:5]
+    assert results[0]['similarity'] >= results[-1]['similarity']
+
+
+def test_matrix_scan_applies_filters(plain_db):
+    documents = DocumentModel(plain_db)
+    embeddings = add_corpus(documents)
+    query = embeddings[4]
+    hostel = np.arange(len(embeddings)) % 2 == 1
+
+    results = documents.search_documents(query.tolist(), limit=3, category="hostel")
+    assert [r['id'] for r in results] == expected_ranking(embeddings, query, hostel)[:3]
+    assert all(r['category'] == "hostel" for r in results)
+    assert documents.search_documents(query.tolist(), category="library") == []
+
+
+def test_matrix_cache_sees_new_documents(plain_db):
+    documents = DocumentModel(plain_db)
+    embeddings = add_corpus(documents, n=10)
+    documents.search_documents(embeddings[0].tolist())
+
+    new_id = documents.add_document("new", "new", [0.0] * 7 + [1.0])
+    assert documents.search_documents([0.0] * 7 + [1.0], limit=1)[0]['id'] == new_id
+
+
+def test_vec0_search_matches_brute_force(tmp_path):
+    manager = DatabaseManager(str(tmp_path / "vec.db"))
+    manager.connect()
+    try:
+        if not manager.vec_enabled:
+            pytest.skip("sqlite-vec cannot be loaded in this Python build")
+        manager.initialize_schema()
+        documents = DocumentModel(manager)
+        embeddings = add_corpus(documents)
+        query = embeddings[11]
+        hostel = np.arange(len(embeddings)) % 2 == 1
+
+        assert manager.vec_dim == embeddings.shape[1]
+        results = documents.search_documents(query.tolist(), limit=5)
+        assert [r['id'] for r in results] == expected_ranking(embeddings, query)[:5]
+        results = documents.search_documents(query.tolist(), limit=3, category="hostel")
+        assert [r['id'] for r in results] == expected_ranking(embeddings, query, hostel)[:3]
+    finally:
+        manager.disconnect()
+
+
+def test_large_corpus_is_served_by_persisted_hnsw_index(plain_db):
+    pytest.importorskip("hnswlib")
+    documents = DocumentModel(plain_db, hnsw_min_docs=10)
+    embeddings = add_corpus(documents)
+    query = embeddings[8]
+
+    results = documents.search_documents(query.tolist(), limit=5)
+    assert documents._index is not None and documents.index_path.exists()
+    assert results[0]['id'] == expected_ranking(embeddings, query)[0]
+    assert results[0]['similarity'] == pytest.approx(1.0, abs=1e-4)
+
+    new_id = documents.add_document("new", "new", [0.0] * 7 + [1.0])
+    assert documents.search_documents([0.0] * 7 + [1.0], limit=1)[0]['id'] == new_id
+
+    reopened = DocumentModel(plain_db, hnsw_min_docs=10)
+    results = reopened.search_documents(query.tolist(), limit=3, category="fees")
+    assert results[0]['id'] == 9 and all(r['category'] == "fees" for r in results)
+
+
+def test_mismatched_embedding_dimension_is_rejected(plain_db):
+    documents = DocumentModel(plain_db)
+    documents.add_document("a", "a", [1.0, 0.0, 0.0])
+
+    with pytest.raises(ValueError):
+        documents.add_document("b", "b", [1.0, 0.0])
+    assert DocumentModel(plain_db)._stored_dim() == 3
+    assert count_rows(plain_db, "documents") == 1
+
+
+def test_async_writer_runs_calls_on_one_thread(db):
+    writer = AsyncDBWriter(db)
+    sessions = SessionModel(db)
+
+    async def write_all():
+        threads = await asyncio.gather(*(writer.run(threading.get_ident) for _ in range(5)))
+        await asyncio.gather(*(writer.run(sessions.add_conversation, "s1", f"q{i}", f"a{i}") for i in range(5)))
+        return threads
+
+    threads = asyncio.run(write_all())
+    writer.shutdown()
+    assert len(set(threads)) == 1 and threads[0] != threading.get_ident()
+    assert count_rows(db, "conversations") == 5
+
+
+def test_readers_open_paths_with_uri_special_characters(tmp_path):
+    directory = tmp_path / "kiosk #1 ?100%"
+    directory.mkdir()
+    manager = DatabaseManager(str(directory / "koisk.db"))
+    manager.connect()
+    try:
+        manager.initialize_schema()
+        SessionModel(manager).create_session("s1")
+        assert count_rows(manager, "sessions") == 1
+    finally:
+        manager.disconnect()
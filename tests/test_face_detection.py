@@ -0,0 +1,80 @@
+"""
+Unit tests for FaceDetector camera lifecycle, using a stand-in cv2 module.
+"""
+
+import sys
+import types
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+
+class FakeCapture:
+    opened = []
+
+    def __init__(self, device):
+        FakeCapture.opened.append(device)
+        self.released = False
+
+    def isOpened(self):
+        return True
+
+    def set(self, prop, value):
+        return True
+
+    def read(self):
+        return True, np.zeros((240, 320, 3), dtype=np.uint8)
+
+    def release(self):
+        self.released = True
+
+
+class FakeCascade:
+    def __init__(self, path):
+        self.path = path
+
+    def empty(self):
+        return False
+
+
+@pytest.fixture
+def fake_cv2(monkeypatch):
+    cv2 = types.SimpleNamespace(
+        VideoCapture=FakeCapture,
+        CascadeClassifier=FakeCascade,
+        data=types.SimpleNamespace(haarcascades="/fake/"),
+        ocl=types.SimpleNamespace(haveOpenCL=lambda: False),
+        CAP_PROP_FRAME_WIDTH=3, CAP_PROP_FRAME_HEIGHT=4, CAP_PROP_FPS=5, CAP_PROP_BUFFERSIZE=38,
+    )
+    monkeypatch.setitem(sys.modules, "cv2", cv2)
+    FakeCapture.opened = []
+    return cv2
+
+
+def test_constructing_detector_does_not_open_camera(fake_cv2):
+    from components.face_detection import FaceDetector
+
+    detector = FaceDetector({"hardware": {"camera_device": "/dev/video0"}})
+
+    assert FakeCapture.opened == []
+    assert detector.cap is None
+    assert detector._capture_thread is None
+    detector.release()
+
+
+def test_resume_starts_capture_and_pause_stops_it(fake_cv2):
+    from components.face_detection import FaceDetector
+
+    detector = FaceDetector({"hardware": {"camera_device": "/dev/video0"}})
+    assert detector.resume()
+    assert FakeCapture.opened == ["/dev/video0"]
+    assert detector._get_frame(timeout=1.0) is not None
+
+    detector.pause()
+    assert detector.cap is None
+    assert detector._capture_thread is None
+    detector.release()
@@ -0,0 +1,134 @@
+"""
+Unit tests for KnowledgeBaseRepository query construction (no PostgreSQL needed).
+"""
+
+import asyncio
+import json
+import sys
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from repositories.knowledge_base_repository import KnowledgeBaseRepository
+
+
+class FakeConnection:
+    """Records statements; fetchval answers the selectivity probe."""
+
+    def __init__(self, selective: bool):
+        self.selective = selective
+        self.executed = []
+        self.fetched = []
+
+    async def fetchval(self, query, *args):
+        return self.selective
+
+    async def execute(self, query, *args):
+        self.executed.append(query)
+
+    async def fetch(self, query, *args):
+        self.fetched.append((query, args))
+        return []
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield
+
+
+class FakePool:
+    def __init__(self, conn):
+        self.conn = conn
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield self.conn
+
+
+class SchemaConnection(FakeConnection):
+    """Answers the schema-setup queries for a corpus whose HNSW index already exists."""
+
+    def __init__(self, total_docs: int, reloptions):
+        super().__init__(selective=False)
+        self.total_docs = total_docs
+        self.reloptions = reloptions
+
+    async def fetchval(self, query, *args):
+        if "format_type" in query:
+            return "vector(384)"
+        return self.total_docs
+
+    async def fetchrow(self, query, *args):
+        return {'reloptions': self.reloptions}
+
+
+def create_tables(total_docs: int, reloptions, monkeypatch):
+    repo = KnowledgeBaseRepository()
+    for name, value in {'USE_IVFFLAT': False, 'USE_HALFVEC': False, 'VECTOR_DIMENSIONS': 384,
+                        'HNSW_M': None, 'HNSW_EF_CONSTRUCTION': None, 'HNSW_EF_SEARCH': None}.items():
+        monkeypatch.setattr(repo.settings, name, value)
+    conn = SchemaConnection(total_docs, reloptions)
+    repo._connection_pool = FakePool(conn)
+    asyncio.run(repo._create_tables())
+    return repo, conn
+
+
+def search(selective: bool, filter_metadata=None, ef_search=None):
+    repo = KnowledgeBaseRepository()
+    conn = FakeConnection(selective)
+    repo._connection_pool = FakePool(conn)
+    repo._hnsw_ef_search = ef_search
+    asyncio.run(repo.search_similar_documents([0.1, 0.2, 0.3], k=5, filter_metadata=filter_metadata))
+    return conn
+
+
+def test_search_sql_text_is_stable_per_shape():
+    assert KnowledgeBaseRepository._search_sql(True, False) is KnowledgeBaseRepository._search_sql(True, False)
+    assert "metadata @> $3::jsonb" in KnowledgeBaseRepository._search_sql(True, True)
+    assert "$4::float" in KnowledgeBaseRepository._search_sql(True, True)
+    assert "$3::float" in KnowledgeBaseRepository._search_sql(False, True)
+    assert "@>" not in KnowledgeBaseRepository._search_sql(False, False)
+
+
+def test_filter_is_sent_as_one_jsonb_parameter():
+    conn = search(selective=False, filter_metadata={'category': 'hostel', 'language': 'en'})
+    query, args = conn.fetched[0]
+
+    assert query.count("@>") == 1
+    assert json.loads(args[2]) == {'category': 'hostel', 'language': 'en'}
+
+
+def test_selective_filter_forces_exact_custom_plan():
+    conn = search(selective=True, filter_metadata={'category': 'hostel'}, ef_search=40)
+
+    assert "SET LOCAL enable_indexscan = off" in conn.executed
+    assert "SET LOCAL plan_cache_mode = force_custom_plan" in conn.executed
+    assert not any("hnsw.ef_search" in stmt for stmt in conn.executed)
+
+
+def test_broad_filter_keeps_ann_path_with_ef_search():
+    conn = search(selective=False, filter_metadata={'category': 'hostel'}, ef_search=3)
+
+    assert conn.executed == ["SET LOCAL hnsw.ef_search = 5"]
+
+
+def test_unfiltered_search_skips_selectivity_probe():
+    conn = search(selective=True)
+
+    assert conn.executed == []
+
+
+def test_hnsw_index_is_rebuilt_when_corpus_changes_profile(monkeypatch):
+    repo, conn = create_tables(250_000, ["m=16", "ef_construction=64"], monkeypatch)
+
+    assert "DROP INDEX knowledge_documents_embedding_hnsw" in conn.executed
+    create = next(stmt for stmt in conn.executed if "USING hnsw" in stmt)
+    assert "m = 24, ef_construction = 100" in create
+    assert repo._hnsw_ef_search == 100
+
+
+def test_hnsw_index_matching_profile_is_kept(monkeypatch):
+    _, conn = create_tables(500, None, monkeypatch)  # created without WITH: pgvector defaults 16/64
+
+    assert not any(stmt.startswith("DROP INDEX") for stmt in conn.executed)
@@ -0,0 +1,180 @@
+"""
+Unit tests for LLMComponent context formatting and streaming (no llama.cpp server needed).
+"""
+
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+import aiohttp
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from components.llm_inference import LLMComponent
+
+
+class FakeResponse:
+    def __init__(self, lines=(), status=200, body=b""):
+        self.status = status
+        self.content = self._iter(lines)
+        self.body = body
+
+    async def read(self):
+        return self.body
+
+    @staticmethod
+    async def _iter(lines):
+        for line in lines:
+            yield line
+
+    def raise_for_status(self):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeSession:
+    """Streams the given completion tokens as llama.cpp server-sent events."""
+
+    closed = False
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+
+    def get(self, url, **kwargs):
+        return FakeResponse()
+
+    def post(self, url, **kwargs):
+        lines = [f"data: {json.dumps({'choices': [{'text': t}]})}\n".encode() for t in self.tokens]
+        return FakeResponse(lines + [b"data: [DONE]\n"])
+
+
+class DelayedResponse:
+    """A response that arrives after the model has spent a while generating."""
+
+    def __init__(self, response):
+        self.response = response
+
+    async def __aenter__(self):
+        await asyncio.sleep(0.05)
+        return self.response
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class BusyServerSession:
+    """A single-slot server: health probes time out while a completion is generating."""
+
+    closed = False
+
+    def __init__(self, refuse=False):
+        self.refuse = refuse
+        self.probes = 0
+
+    def get(self, url, **kwargs):
+        self.probes += 1
+        if self.refuse:
+            raise aiohttp.ClientConnectionError("connection refused")
+        return FakeResponse()
+
+    def post(self, url, **kwargs):
+        if self.refuse:
+            raise aiohttp.ClientConnectionError("connection refused")
+        return DelayedResponse(FakeResponse(body=json.dumps({'choices': [{'text': "Library opens at 9am."}]}).encode()))
+
+
+class SlowProbeSession(BusyServerSession):
+    def get(self, url, **kwargs):
+        self.probes += 1
+        raise asyncio.TimeoutError()
+
+
+def make_llm(session):
+    llm = LLMComponent({'llm': {'semantic_cache': False, 'temperature': 0.9}})
+    llm._session = session
+    llm.is_initialized = True
+    return llm
+
+
+def stream(tokens):
+    llm = LLMComponent({'llm': {'semantic_cache': False}})
+    llm._session = FakeSession(tokens)
+    llm.is_initialized = True
+
+    async def collect():
+        return [chunk async for chunk in llm.stream_response("hi", use_rag=False)]
+
+    return llm, asyncio.run(collect())
+
+
+def test_streamed_answer_matches_post_processed_text():
+    tokens = ["Based on", " the context", " provided:", " the library", " opens at", " 9am.", "\n\n\n\n", "Closed", " Sundays."]
+    llm, chunks = stream(tokens)
+
+    assert "".join(chunks) == llm._post_process_response("".join(tokens))
+    assert "".join(chunks) == "The library opens at 9am.\n\nClosed Sundays."
+    assert len(chunks) > 1  # still incremental
+
+
+def test_stream_stops_at_role_marker():
+    tokens = ["The fee", " is due", " in July.", "\nUs", "er:", " and more"]
+    _, chunks = stream(tokens)
+
+    assert "".join(chunks) == "The fee is due in July."
+
+
+def test_stream_without_preamble_is_unchanged():
+    tokens = ["  Hostel", " rooms are", " shared."]
+    _, chunks = stream(tokens)
+
+    assert "".join(chunks) == "Hostel rooms are shared."
+
+
+def test_context_ranks_documents_missing_similarity_last():
+    llm = LLMComponent({'llm': {'semantic_cache': False}})
+    docs = [
+        {'title': 'No score', 'content': 'c'},
+        {'title': 'Best', 'content': 'a', 'similarity': 0.9},
+        {'title': 'Second', 'content': 'b', 'similarity': 0.4},
+    ]
+
+    context = llm._format_rag_context(docs)
+    assert context.index('Best') < context.index('Second') < context.index('No score')
+
+
+def test_slow_health_probe_does_not_disable_busy_server():
+    session = SlowProbeSession()
+    llm = make_llm(session)
+
+    async def run():
+        return await asyncio.gather(
+            llm.generate_response("hours?", use_rag=False),
+            llm.check_server_health(),
+            llm.generate_response("hours?", use_rag=False),
+        )
+
+    first, probe_ok, second = asyncio.run(run())
+    assert not probe_ok
+    assert first == second == "Library opens at 9am."
+    assert llm.is_initialized
+    assert session.probes == 1  # only the explicit probe; requests don't probe a live server
+
+
+def test_refused_connection_falls_back_until_probe_succeeds():
+    session = BusyServerSession(refuse=True)
+    llm = make_llm(session)
+
+    answer = asyncio.run(llm.generate_response("hours?", use_rag=False))
+    assert not llm.is_initialized
+    assert answer == llm._generate_fallback_response("hours?")
+
+    session.refuse = False
+    assert asyncio.run(llm.generate_response("hours?", use_rag=False)) == "Library opens at 9am."
+    assert llm.is_initialized
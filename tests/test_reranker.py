@@ -0,0 +1,114 @@
+"""
+Unit tests for RerankerComponent candidate handling (no model download needed).
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from components.reranker import RerankerComponent
+
+
+class FakeCrossEncoder:
+    """Scores a pair by how often the query occurs in the document."""
+
+    def __init__(self):
+        self.pairs_seen = 0
+
+    def predict(self, pairs, **kwargs):
+        self.pairs_seen += len(pairs)
+        return np.array([content.count(query) for query, content in pairs], dtype=np.float32)
+
+
+def make_reranker(**config) -> RerankerComponent:
+    reranker = RerankerComponent({'final_top_k': 2, 'prune_multiplier': 0, **config})
+    reranker.model = FakeCrossEncoder()
+    reranker.is_initialized = True
+    return reranker
+
+
+def make_docs():
+    return [
+        {'content': 'fees fees', 'similarity': 0.9},
+        {'content': 'hostel', 'similarity': 0.8},
+        {'content': 'fees fees fees', 'similarity': 0.7},
+    ]
+
+
+def test_literal_query_keeps_retrieval_order_with_scores():
+    reranker = make_reranker()
+    results = asyncio.run(reranker.rerank("hostel", make_docs()))
+
+    assert [doc['similarity'] for doc in results] == [0.9, 0.8]
+    assert [doc['rerank_score'] for doc in results] == [0.9, 0.8]
+    assert reranker.model.pairs_seen == 0
+
+
+def test_literal_query_sync_path_sets_scores():
+    reranker = make_reranker()
+    results = reranker.rerank_sync('"fees"', make_docs())
+
+    assert all(isinstance(doc['rerank_score'], float) for doc in results)
+    assert reranker.model.pairs_seen == 0
+
+
+def test_multi_word_query_is_reranked():
+    reranker = make_reranker(skip_rerank_literal=True)
+    results = reranker.rerank_sync("fees for hostel", make_docs())
+
+    assert reranker.model.pairs_seen == 3
+    assert len(results) == 2
+
+
+def test_score_cache_skips_model_for_repeated_pairs():
+    reranker = make_reranker(skip_rerank_literal=False)
+    first = reranker.rerank_sync("fees", make_docs(), top_k=3)
+    assert reranker.model.pairs_seen == 3
+
+    second = reranker.rerank_sync("fees", make_docs(), top_k=3)
+    assert reranker.model.pairs_seen == 3  # every pair served from the cache
+    assert [d['rerank_score'] for d in second] == [d['rerank_score'] for d in first]
+
+    docs = make_docs() + [{'content': 'fees', 'similarity': 0.6}]
+    reranker.rerank_sync("fees", docs, top_k=4)
+    assert reranker.model.pairs_seen == 4  # only the new document is scored
+
+
+def test_score_cache_entries_expire(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr("components.reranker.time.monotonic", lambda: clock[0])
+    reranker = make_reranker(skip_rerank_literal=False, rerank_cache_ttl_seconds=10)
+    reranker.rerank_sync("fees", make_docs())
+
+    clock[0] += 11
+    reranker.rerank_sync("fees", make_docs())
+    assert reranker.model.pairs_seen == 6
+
+
+def test_near_duplicates_are_scored_once():
+    reranker = make_reranker(skip_rerank_literal=False, dedup_threshold=0.95)
+    docs = [
+        {'content': 'fees due in july', 'similarity': 0.7, 'embedding': [1.0, 0.0, 0.0]},
+        {'content': 'fees due in july (copy)', 'similarity': 0.9, 'embedding': [0.99, 0.01, 0.0]},
+        {'content': 'hostel rules', 'similarity': 0.5, 'embedding': [0.0, 1.0, 0.0]},
+    ]
+
+    results = reranker.rerank_sync("fees due", docs, top_k=3)
+    assert reranker.model.pairs_seen == 2
+    assert [d['content'] for d in results if 'fees' in d['content']] == ['fees due in july (copy)']
+
+
+def test_duplicate_collapse_needs_embeddings_on_every_candidate():
+    reranker = make_reranker(dedup_threshold=0.95)
+    docs = [
+        {'content': 'a', 'embedding': [1.0, 0.0]},
+        {'content': 'b', 'embedding': [1.0, 0.0]},
+        {'content': 'c'},
+    ]
+
+    assert reranker._collapse_duplicates(docs) is docs
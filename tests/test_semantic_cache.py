@@ -0,0 +1,68 @@
+"""
+Unit tests for the semantic response cache.
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from components.semantic_cache import SemanticCache
+
+
+def unit(*values):
+    vec = np.asarray(values, dtype=np.float32)
+    return vec / np.linalg.norm(vec)
+
+
+def test_similar_query_hits_and_dissimilar_misses():
+    cache = SemanticCache(threshold=0.9)
+    cache.store([1.0, 0.0, 0.0], "library hours")
+
+    assert cache.lookup([0.99, 0.05, 0.0]) == "library hours"
+    assert cache.lookup([0.0, 1.0, 0.0]) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_lookup_is_scale_invariant():
+    cache = SemanticCache(threshold=0.99)
+    cache.store([2.0, 2.0], "fees")
+
+    assert cache.lookup([5.0, 5.0]) == "fees"
+
+
+def test_full_cache_evicts_least_recently_used():
+    cache = SemanticCache(threshold=0.99, max_entries=2)
+    cache.store(unit(1, 0, 0), "a")
+    cache.store(unit(0, 1, 0), "b")
+    assert cache.lookup(unit(1, 0, 0)) == "a"  # "b" is now least recently used
+
+    cache.store(unit(0, 0, 1), "c")
+    assert len(cache) == 2
+    assert cache.lookup(unit(0, 1, 0)) is None
+    assert cache.lookup(unit(1, 0, 0)) == "a"
+    assert cache.lookup(unit(0, 0, 1)) == "c"
+
+
+def test_expired_entries_do_not_hit(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr("components.semantic_cache.time.monotonic", lambda: clock[0])
+    cache = SemanticCache(threshold=0.9, ttl_seconds=10)
+    cache.store([1.0, 0.0], "hostel")
+
+    clock[0] += 5
+    assert cache.lookup([1.0, 0.0]) == "hostel"
+    clock[0] += 6
+    assert cache.lookup([1.0, 0.0]) is None
+
+
+def test_clear_empties_cache():
+    cache = SemanticCache()
+    cache.store([1.0, 0.0], "x")
+    cache.clear()
+
+    assert len(cache) == 0
+    assert cache.lookup([1.0, 0.0]) is None
@@ -0,0 +1,75 @@
+"""
+Unit tests for the in-process FAISS knowledge-base index.
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+pytest.importorskip("faiss")
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from components.vector_index import FaissVectorIndex
+
+
+def make_rows(n: int, dim: int = 8, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    embeddings = rng.normal(size=(n, dim)).astype(np.float32)
+    return [
+        {
+            'id': i,
+            'content': f"doc {i}",
+            'metadata': {'category': 'hostel' if i % 2 else 'fees'},
+            'embedding': embeddings[i].tolist(),
+        }
+        for i in range(n)
+    ], embeddings
+
+
+def test_small_corpus_uses_exact_search(tmp_path):
+    rows, embeddings = make_rows(20)
+    index = FaissVectorIndex(str(tmp_path / "kb.index"))
+    index.build(rows)
+
+    hits = index.search(embeddings[7], k=3)
+    assert hits[0]['document']['id'] == 7
+    assert hits[0]['similarity'] == pytest.approx(1.0, abs=1e-5)
+    assert [h['similarity'] for h in hits] == sorted((h['similarity'] for h in hits), reverse=True)
+
+
+def test_filter_and_threshold(tmp_path):
+    rows, embeddings = make_rows(20)
+    index = FaissVectorIndex(str(tmp_path / "kb.index"))
+    index.build(rows)
+
+    hits = index.search(embeddings[3], k=5, filter_metadata={'category': 'hostel'})
+    assert hits and all(h['document']['metadata']['category'] == 'hostel' for h in hits)
+    assert hits[0]['document']['id'] == 3
+
+    hits = index.search(embeddings[3], k=5, similarity_threshold=0.999)
+    assert [h['document']['id'] for h in hits] == [3]
+
+
+def test_large_corpus_trains_ivfpq(tmp_path):
+    rows, embeddings = make_rows(300)
+    index = FaissVectorIndex(str(tmp_path / "kb.index"), nlist=4, pq_m=4, nbits=4, nprobe=4)
+    index.build(rows)
+
+    assert type(index.index).__name__ == "IndexIVFPQ"
+    hits = index.search(embeddings[42], k=5)
+    assert 42 in [h['document']['id'] for h in hits]
+
+
+def test_persisted_index_reloads_and_detects_staleness(tmp_path):
+    rows, embeddings = make_rows(20)
+    FaissVectorIndex(str(tmp_path / "kb.index")).build(rows)
+
+    reloaded = FaissVectorIndex(str(tmp_path / "kb.index"))
+    assert not reloaded.load(expected_count=21)
+    assert reloaded.load(expected_count=20)
+    assert len(reloaded) == 20
+    assert reloaded.search(embeddings[5], k=1)[0]['document']['id'] == 5